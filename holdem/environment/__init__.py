@@ -1,5 +1,33 @@
-from .card import Card
-from .compare import compare_hands
-from .hand import Hand, HandCategory
-from .env import Env, evaluate_perf, transform_trajectory
-from .game import num_actions, state_shape
+from .card import Card
+from .compare import compare_hands
+from .evaluator import (
+    EvaluationCache,
+    IncrementalEvaluator,
+    evaluate_cards,
+    evaluation_cache,
+)
+from .hand import Hand, HandCategory, evaluate_batch
+from .env import (
+    Env,
+    EnvState,
+    TransitionBuffer,
+    evaluate_perf,
+    legal_id_lookup,
+    transform_trajectory,
+)
+from .game import (
+    BettingTable,
+    VecHoldemGame,
+    betting_table,
+    num_actions,
+    state_shape,
+)
+from .preflop import PreflopTable
+from .isomorphism import HandIndexer
+from .parallel import Episode, ParallelEnvRunner
+from .evaluation import (
+    PayoffStats,
+    ShardPool,
+    evaluate_parallel,
+    evaluate_sequential,
+)
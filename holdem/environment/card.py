@@ -96,20 +96,35 @@ suit_lookup: str = "SCDH"
 
 
 class Card:
+    # Game code passes plain card ids around; Card is only a view over one
+    # for display and for code that still expects suit and rank strings.
+    __slots__ = ("card_id",)
+
     def __init__(self, suit: str, rank: str) -> None:
-        self.suit: str = suit
-        self.rank: str = rank
+        self.card_id: int = card_map[suit + rank]
+
+    @classmethod
+    def from_id(cls, card_id: int) -> "Card":
+        card: Card = cls.__new__(cls)
+        card.card_id = card_id
+        return card
+
+    @property
+    def suit(self) -> str:
+        return index_map[self.card_id][0]
+
+    @property
+    def rank(self) -> str:
+        return index_map[self.card_id][1]
 
     def __eq__(self, other: "Card") -> bool:
-        return self.rank == other.rank and self.suit == other.suit
+        return self.card_id == other.card_id
 
     def __hash__(self) -> int:
-        suit_index: int = valid_suit.index(self.suit)
-        rank_index: int = valid_rank.index(self.rank)
-        return 100 * suit_index + rank_index
+        return self.card_id
 
     def __str__(self) -> str:
         return self.index()
 
     def index(self) -> str:
-        return self.suit + self.rank
+        return index_map[self.card_id]
@@ -1,5 +1,5 @@
 import copy
-from typing import Any, List, Tuple
+from typing import Any, Callable, Dict, List, Sequence, Tuple
 import numpy as np
 from collections import OrderedDict
 
@@ -8,8 +8,9 @@ from .game import (
     HoldemGameState,
     HoldemPlayerAction,
     action_lookup,
+    legal_action_lookup,
 )
-from .card import card_map
+from .card import index_map
 from ..utils.random import create_random_generator
 from ..models.agent import Agent
 
@@ -25,12 +26,185 @@ def convert_action(
     return action_lookup[action_id]
 
 
+def convert_masked_action(action_id: int, legal_mask: int) -> int:
+    # convert_action over a legal bitmask, returning an action id
+    if legal_mask >> action_id & 1:
+        return action_id
+    if legal_mask >> HoldemPlayerAction.CHECK & 1:
+        return HoldemPlayerAction.CHECK
+    return HoldemPlayerAction.FOLD
+
+
+# Action ids of every legal bitmask, in the order of action_lookup.
+legal_id_lookup: List[List[int]] = [
+    [action_lookup.index(action) for action in actions]
+    for actions in legal_action_lookup
+]
+
+
+class EnvState(dict):
+    # The state dict handed to agents. raw_obs and action_record are left
+    # out until someone reads them, and are then built from what the game
+    # looked like when the state was made.
+    lazy_keys: Tuple[str, ...] = ("raw_obs", "action_record")
+
+    def __init__(
+        self,
+        obs: np.ndarray,
+        game: HoldemGame,
+        player_id: int,
+        action_record: List[Tuple[int, HoldemPlayerAction]],
+    ) -> None:
+        assert game.players is not None
+        assert game.public_cards is not None
+
+        legal_mask: int = game.legal_mask()
+        super().__init__(
+            obs=obs,
+            legal_actions=OrderedDict.fromkeys(legal_id_lookup[legal_mask]),
+            raw_legal_actions=list(legal_action_lookup[legal_mask]),
+        )
+        self.__hand: List[int] = game.players[player_id].hand
+        self.__public_cards: Tuple[int, ...] = tuple(game.public_cards)
+        self.__all_chips: List[int] = [p.in_chips for p in game.players]
+        self.__my_chips: int = game.players[player_id].in_chips
+        self.__raise_nums: List[int] = list(game.last_raises)
+        self.__legal_mask: int = legal_mask
+        self.__action_record = action_record
+
+    def __missing__(self, key: str) -> Any:
+        match key:
+            case "raw_obs":
+                value: Any = {
+                    "hand": [index_map[c] for c in self.__hand],
+                    "public_cards": [
+                        index_map[c] for c in self.__public_cards
+                    ],
+                    "all_chips": self.__all_chips,
+                    "my_chips": self.__my_chips,
+                    "legal_actions": list(
+                        legal_action_lookup[self.__legal_mask]
+                    ),
+                    "raise_nums": self.__raise_nums,
+                }
+            case "action_record":
+                value = self.__action_record
+            case _:
+                raise KeyError(key)
+        self[key] = value
+        return value
+
+    @property
+    def legal_mask(self) -> int:
+        return self.__legal_mask
+
+    def materialize(self) -> "EnvState":
+        for key in self.lazy_keys:
+            self[key]
+        return self
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.lazy_keys or super().__contains__(key)
+
+    def __iter__(self):
+        return super(EnvState, self.materialize()).__iter__()
+
+    def __len__(self) -> int:
+        return super(EnvState, self.materialize()).__len__()
+
+    def keys(self):
+        return super(EnvState, self.materialize()).keys()
+
+    def values(self):
+        return super(EnvState, self.materialize()).values()
+
+    def items(self):
+        return super(EnvState, self.materialize()).items()
+
+
+class TransitionBuffer:
+    # Columnar store of (obs, action, reward, next_obs, legal_mask, done)
+    # rows, growing by doubling. legal_mask is the bitmask of the legal
+    # actions in next_obs.
+    def __init__(self, capacity: int = 1024, obs_size: int = 72) -> None:
+        self.size: int = 0
+        self.obs: np.ndarray = np.zeros((capacity, obs_size), np.float32)
+        self.actions: np.ndarray = np.zeros(capacity, np.int64)
+        self.rewards: np.ndarray = np.zeros(capacity, np.float32)
+        self.next_obs: np.ndarray = np.zeros((capacity, obs_size), np.float32)
+        self.legal_masks: np.ndarray = np.zeros(capacity, np.uint8)
+        self.dones: np.ndarray = np.zeros(capacity, dtype=bool)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(
+        self,
+        obs: np.ndarray,
+        action: int,
+        reward: float,
+        next_obs: np.ndarray,
+        legal_mask: int,
+        done: bool,
+    ) -> None:
+        if self.size == len(self.actions):
+            for name in self.columns():
+                column: np.ndarray = getattr(self, name)
+                setattr(
+                    self,
+                    name,
+                    np.concatenate([column, np.zeros_like(column)]),
+                )
+
+        row: int = self.size
+        self.obs[row] = obs
+        self.actions[row] = action
+        self.rewards[row] = reward
+        self.next_obs[row] = next_obs
+        self.legal_masks[row] = legal_mask
+        self.dones[row] = done
+        self.size += 1
+
+    @staticmethod
+    def columns() -> Tuple[str, ...]:
+        return (
+            "obs",
+            "actions",
+            "rewards",
+            "next_obs",
+            "legal_masks",
+            "dones",
+        )
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        # views over the filled rows, valid until the next add or clear
+        return {
+            name: getattr(self, name)[: self.size] for name in self.columns()
+        }
+
+    def clear(self) -> None:
+        self.size = 0
+
+
+TransitionSink = (
+    TransitionBuffer
+    | Callable[[np.ndarray, int, float, np.ndarray, int, bool], Any]
+)
+
+
 class Env:
     def __init__(
         self,
         agents: List[Agent],
         num_players: int = 2,
         seed: int = 3407,
+        obs_dtype: np.dtype = np.float32,
     ) -> None:
         random, _ = create_random_generator(seed)
 
@@ -43,33 +217,83 @@ class Env:
         self.timestep = 0
         self.action_recorder: List[Tuple[int, HoldemPlayerAction]] = []
 
+        # written in place by observe when no buffer is passed
+        self.obs_dtype: np.dtype = np.dtype(obs_dtype)
+        self.obs_buffer: np.ndarray = np.zeros(72, dtype=self.obs_dtype)
+
     @property
     def num_players(self) -> int:
         return self.game.num_players
 
-    def reset(self) -> Tuple[HoldemGameState, int]:
-        state, player_id = self.game.reset()
+    def reset(
+        self,
+        cards: Sequence[int] | None = None,
+        small_starter: int | None = None,
+    ) -> Tuple[HoldemGameState, int]:
+        player_id: int = self.game.start(cards, small_starter)
         self.action_recorder = []
-        return self.__extract_state(state), player_id
+        return self.__extract_state(player_id), player_id
 
     def step(self, action: int) -> Tuple[HoldemGameState, int]:
-        converted_action: HoldemPlayerAction = convert_action(
-            action, self.game.legal_actions()
-        )
+        player_id: int = self.__apply(action)
+        return self.__extract_state(player_id), player_id
+
+    # The fast interface skips the state dict: the observation is written
+    # into out, or into obs_buffer, and legal actions come as a bitmask
+    # where bit i stands for action i.
+    def fast_reset(
+        self, out: np.ndarray | None = None
+    ) -> Tuple[np.ndarray, int, int]:
+        player_id: int = self.game.start()
+        self.action_recorder = []
+        return self.observe(player_id, out), self.game.legal_mask(), player_id
+
+    def fast_step(
+        self, action: int, out: np.ndarray | None = None
+    ) -> Tuple[np.ndarray, int, int]:
+        player_id: int = self.__apply(action)
+        return self.observe(player_id, out), self.game.legal_mask(), player_id
+
+    def observe(
+        self, player_id: int, out: np.ndarray | None = None
+    ) -> np.ndarray:
+        assert self.game.players is not None
+        assert self.game.public_cards is not None
+
+        if out is None:
+            out = self.obs_buffer
+        out.fill(0)
+        for card in self.game.players[player_id].hand:
+            out[card] = 1
+        for card in self.game.public_cards:
+            out[card] = 1
+        for i, num in enumerate(self.game.last_raises):
+            out[52 + i * 5 + num] = 1
+        return out
+
+    def legal_mask(self) -> int:
+        return self.game.legal_mask()
+
+    def __apply(self, action: int) -> int:
+        converted_action: HoldemPlayerAction = action_lookup[
+            convert_masked_action(action, self.game.legal_mask())
+        ]
         self.timestep += 1
         self.action_recorder.append((self.game.turn_id, converted_action))
-        next_state, player_id = self.game.step(converted_action)
-        return self.__extract_state(next_state), player_id
+        return self.game.apply(converted_action)
 
     def run(
-        self, is_training=False
+        self,
+        is_training=False,
+        cards: Sequence[int] | None = None,
+        small_starter: int | None = None,
     ) -> Tuple[int, List[List[HoldemGameState | int]], List[float]]:
         trajectories: List[List[HoldemGameState | int]] = [
             [] for _ in range(self.game.num_players)
         ]
         state: HoldemGameState
         starter_id: int
-        state, starter_id = self.reset()
+        state, starter_id = self.reset(cards, small_starter)
 
         player_id: int = starter_id
         trajectories[player_id].append(state)
@@ -99,36 +323,82 @@ class Env:
         payoffs = self.game.payoffs()
         return starter_id, trajectories, payoffs
 
+    def stream(
+        self,
+        sink: TransitionSink,
+        players: Sequence[int] | None = None,
+        is_training: bool = False,
+    ) -> Tuple[int, List[float]]:
+        # Plays a hand like run, but hands the transitions of players to
+        # sink as soon as they are complete instead of keeping trajectories.
+        # These are the rows transform_trajectory makes, and the reward of
+        # the last one of each player is filled in once the payoffs are
+        # known. Callbacks get arrays they may keep.
+        emit: Callable[..., Any] = (
+            sink.add if isinstance(sink, TransitionBuffer) else sink
+        )
+        watched: List[bool] = [
+            players is None or player in players
+            for player in range(self.num_players)
+        ]
+        last_obs: List[np.ndarray | None] = [None] * self.num_players
+        last_actions: List[int] = [0] * self.num_players
+
+        state: EnvState
+        starter_id: int
+        state, starter_id = self.reset()
+
+        player_id: int = starter_id
+        while not self.is_over():
+            if watched[player_id] and last_obs[player_id] is not None:
+                emit(
+                    last_obs[player_id],
+                    last_actions[player_id],
+                    0.0,
+                    state["obs"],
+                    state.legal_mask,
+                    False,
+                )
+
+            action: int
+            if not is_training:
+                action, _ = self.agents[player_id].eval_step(state)
+            else:
+                action = self.agents[player_id].step(state)
+            last_obs[player_id] = state["obs"]
+            last_actions[player_id] = action
+
+            state, player_id = self.step(action)
+
+        payoffs: List[float] = self.game.payoffs()
+        legal_mask: int = self.game.legal_mask()
+        for player_id in range(self.num_players):
+            if watched[player_id] and last_obs[player_id] is not None:
+                emit(
+                    last_obs[player_id],
+                    last_actions[player_id],
+                    payoffs[player_id],
+                    self.observe(
+                        player_id, np.zeros(72, dtype=self.obs_dtype)
+                    ),
+                    legal_mask,
+                    True,
+                )
+        return starter_id, payoffs
+
     def is_over(self) -> bool:
         return self.game.is_over()
 
     def get_state(self, player_id) -> HoldemGameState:
-        return self.__extract_state(self.game.get_state(player_id))
-
-    def __extract_state(self, state: HoldemGameState) -> HoldemGameState:
-        result: HoldemGameState = {}
-
-        obs = np.zeros(72)
-        obs[
-            [card_map[card] for card in state["public_cards"] + state["hand"]]
-        ] = 1
-        for i, num in enumerate(state["raise_nums"]):
-            obs[52 + i * 5 + num] = 1
-        result["obs"] = obs
-        result["legal_actions"] = OrderedDict(
-            {
-                action_lookup.index(action): None
-                for action in state["legal_actions"]
-            }
-        )
-
-        result["raw_obs"] = state
-        result["raw_legal_actions"] = [
-            action for action in state["legal_actions"]
-        ]
-        result["action_record"] = self.action_recorder
+        return self.__extract_state(player_id)
 
-        return result
+    def __extract_state(self, player_id: int) -> HoldemGameState:
+        return EnvState(
+            self.observe(player_id, np.zeros(72, dtype=self.obs_dtype)),
+            self.game,
+            player_id,
+            self.action_recorder,
+        )
 
 
 def evaluate_perf(env: Env, iters: int) -> List[float]:
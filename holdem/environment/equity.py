@@ -0,0 +1,35 @@
+from itertools import combinations
+from typing import List, Sequence
+import numpy as np
+
+from .evaluator import num_cards
+from .hand import evaluate_batch
+
+# Score of every hand category, indexed by HandCategory value.
+category_weights: np.ndarray = np.array(
+    [0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+)
+
+
+def remaining_cards(known: Sequence[int]) -> List[int]:
+    known_set = set(known)
+    return [card for card in range(num_cards) if card not in known_set]
+
+
+def enumerate_boards(known: Sequence[int], size: int = 7) -> np.ndarray:
+    missing: int = size - len(known)
+    draws: List[tuple] = list(combinations(remaining_cards(known), missing))
+    completions: np.ndarray = np.array(draws, dtype=np.int64).reshape(
+        len(draws), missing
+    )
+    prefix: np.ndarray = np.broadcast_to(
+        np.asarray(known, dtype=np.int64), (len(completions), len(known))
+    )
+    return np.hstack([prefix, completions])
+
+
+def exact_score(known: Sequence[int]) -> float:
+    # On the turn there are 46 rivers and on the flop 1081 turn and river
+    # pairs, few enough to score every completion in one batch.
+    categories, _ = evaluate_batch(enumerate_boards(known))
+    return float(category_weights[categories].mean())
@@ -0,0 +1,309 @@
+import math
+import os
+import pickle
+import random
+import shutil
+import tempfile
+from itertools import permutations
+from multiprocessing import Pool
+from statistics import NormalDist
+from typing import List, Tuple
+
+import numpy as np
+
+from .env import Env
+from .parallel import seed_episode
+from ..models.agent import Agent
+
+
+class PayoffStats:
+    # Running mean and sum of squared deviations of the payoff of every
+    # seat, updated one game at a time with Welford's method. count is the
+    # number of samples, hands the number of hands they took: a duplicate
+    # deal is one sample played once for every seat rotation.
+    def __init__(self, num_players: int) -> None:
+        self.count: int = 0
+        self.hands: int = 0
+        self.mean: np.ndarray = np.zeros(num_players)
+        self.m2: np.ndarray = np.zeros(num_players)
+
+    def add(self, payoffs: List[float], hands: int = 1) -> None:
+        self.count += 1
+        self.hands += hands
+        delta: np.ndarray = np.asarray(payoffs) - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (np.asarray(payoffs) - self.mean)
+
+    def merge(self, other: "PayoffStats") -> None:
+        # the pairwise update of Chan et al., exact for any split of games
+        count: int = self.count + other.count
+        if count == 0:
+            return
+        delta: np.ndarray = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+        self.hands += other.hands
+
+    @property
+    def variance(self) -> np.ndarray:
+        if self.count < 2:
+            return np.full_like(self.mean, np.inf)
+        return self.m2 / (self.count - 1)
+
+    @property
+    def stderr(self) -> np.ndarray:
+        return np.sqrt(self.variance / max(self.count, 1))
+
+    def confidence_interval(
+        self, z: float = 1.96
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # normal approximation, 95% for the default z
+        return self.mean - z * self.stderr, self.mean + z * self.stderr
+
+
+def shard_sizes(num_games: int, shard_size: int) -> List[int]:
+    num_shards: int = math.ceil(num_games / shard_size)
+    return [
+        min(shard_size, num_games - shard * shard_size)
+        for shard in range(num_shards)
+    ]
+
+
+def seat_rotations(num_players: int) -> List[Tuple[int, ...]]:
+    # rotation[seat] is the agent that sits at seat
+    return list(permutations(range(num_players)))
+
+
+def play_duplicate(env: Env) -> np.ndarray:
+    # Plays one deal once per seat rotation: the cards of every seat and
+    # the blinds stay, the agents move. Returns the mean payoff per agent.
+    agents: List[Agent] = env.agents
+    num_players: int = env.num_players
+    num_cards: int = len(env.game.dealer.deck)
+    cards: List[int] = env.game.random.permutation(num_cards).tolist()
+    small_starter: int = env.game.random.randint(0, num_players)
+
+    rotations: List[Tuple[int, ...]] = seat_rotations(num_players)
+    result: np.ndarray = np.zeros(num_players)
+    try:
+        for rotation in rotations:
+            env.agents = [agents[agent] for agent in rotation]
+            _, _, payoffs = env.run(
+                is_training=False, cards=cards, small_starter=small_starter
+            )
+            for seat, agent in enumerate(rotation):
+                result[agent] += payoffs[seat]
+    finally:
+        env.agents = agents
+    return result / len(rotations)
+
+
+def play_shard(
+    env: Env, seed: int, shard: int, num_games: int, duplicate: bool = False
+) -> PayoffStats:
+    # A shard only depends on the seed and its index, so results are the
+    # same for any number of workers.
+    seed_episode(env, seed, shard)
+    stats: PayoffStats = PayoffStats(env.num_players)
+    for _ in range(num_games):
+        if duplicate:
+            stats.add(
+                play_duplicate(env), len(seat_rotations(env.num_players))
+            )
+        else:
+            _, _, payoffs = env.run(is_training=False)
+            stats.add(payoffs)
+    return stats
+
+
+__worker_env: Env | None = None
+# the version of the agents __worker_env plays with
+__worker_version: int = 0
+
+
+def init_worker(payload: bytes, num_players: int) -> None:
+    global __worker_env
+    __worker_env = Env(pickle.loads(payload), num_players)
+
+
+def run_shard(
+    version: int,
+    path: str | None,
+    seed: int,
+    shard: int,
+    num_games: int,
+    duplicate: bool,
+) -> PayoffStats:
+    global __worker_version
+    assert __worker_env is not None
+    if version != __worker_version:
+        # agents set after the pool started, read once by every worker
+        assert path is not None
+        with open(path, "rb") as f:
+            __worker_env.agents = pickle.load(f)
+        __worker_version = version
+    return play_shard(__worker_env, seed, shard, num_games, duplicate)
+
+
+class ShardPool:
+    # Plays shards on a process pool, or in this process for one worker.
+    # A pool can be kept across evaluations and given new agents with
+    # set_agents, which saves starting the workers every time.
+    def __init__(
+        self, agents: List[Agent], num_players: int, num_workers: int
+    ) -> None:
+        self.num_workers: int = num_workers
+        self.env: Env | None = None
+        self.pool: Pool | None = None
+        self.version: int = 0
+        self.directory: str | None = None
+        if num_workers <= 1:
+            self.env = Env(pickle.loads(pickle.dumps(agents)), num_players)
+        else:
+            self.pool = Pool(
+                num_workers,
+                initializer=init_worker,
+                initargs=(pickle.dumps(agents), num_players),
+            )
+
+    def __enter__(self) -> "ShardPool":
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        self.close()
+
+    @property
+    def agents_path(self) -> str | None:
+        if self.directory is None:
+            return None
+        return os.path.join(self.directory, "agents.pkl")
+
+    def set_agents(self, agents: List[Agent]) -> None:
+        if self.env is not None:
+            self.env.agents = pickle.loads(pickle.dumps(agents))
+            return
+
+        # The workers keep running, so the agents go through a file they
+        # read before their next shard instead of through the initializer.
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix="holdem-agents-")
+        with open(self.agents_path, "wb") as f:
+            pickle.dump(agents, f)
+        self.version += 1
+
+    def map(
+        self, tasks: List[Tuple[int, int, int, bool]]
+    ) -> List[PayoffStats]:
+        if self.pool is not None:
+            return self.pool.starmap(
+                run_shard,
+                [(self.version, self.agents_path) + task for task in tasks],
+            )
+
+        assert self.env is not None
+        # shards reseed the global generators, which belong to the caller
+        # when they run in this process
+        numpy_state = np.random.get_state()
+        random_state = random.getstate()
+        try:
+            return [play_shard(self.env, *task) for task in tasks]
+        finally:
+            np.random.set_state(numpy_state)
+            random.setstate(random_state)
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def evaluate_parallel(
+    agents: List[Agent],
+    num_games: int,
+    num_players: int = 2,
+    seed: int = 3407,
+    num_workers: int | None = None,
+    shard_size: int = 100,
+    duplicate: bool = False,
+    pool: ShardPool | None = None,
+) -> PayoffStats:
+    # In duplicate mode num_games counts deals, each played once for every
+    # seat rotation, and the stats are over agents instead of seats. A pool
+    # given here is handed the agents and left open for the next call.
+    sizes: List[int] = shard_sizes(num_games, shard_size)
+    tasks: List[Tuple[int, int, int, bool]] = [
+        (seed, shard, size, duplicate) for shard, size in enumerate(sizes)
+    ]
+
+    shards: List[PayoffStats]
+    if pool is not None:
+        pool.set_agents(agents)
+        shards = pool.map(tasks)
+    else:
+        num_workers = min(num_workers or os.cpu_count() or 1, len(tasks))
+        with ShardPool(agents, num_players, num_workers) as pool:
+            shards = pool.map(tasks)
+
+    result: PayoffStats = PayoffStats(num_players)
+    for stats in shards:
+        result.merge(stats)
+    return result
+
+
+def sequential_z(z: float, looks: int) -> float:
+    # A Bonferroni boundary: the two-sided error of z split evenly over the
+    # looks, so that when the true mean is zero the chance that any of them
+    # crosses the boundary stays within the error of a single look at z.
+    error: float = 2 * (1 - NormalDist().cdf(z))
+    return NormalDist().inv_cdf(1 - error / (2 * max(looks, 1)))
+
+
+def evaluate_sequential(
+    agents: List[Agent],
+    max_games: int = 2000,
+    num_players: int = 2,
+    seed: int = 3407,
+    num_workers: int | None = None,
+    batch_size: int = 100,
+    min_games: int = 200,
+    target_width: float | None = None,
+    stop_on_sign: bool = True,
+    seat: int = 0,
+    z: float = 1.96,
+    duplicate: bool = False,
+) -> PayoffStats:
+    # Plays batches until the interval of seat is narrower than
+    # target_width or, with stop_on_sign, excludes zero, or until max_games.
+    # Batches are the shards of evaluate_parallel and are merged in order,
+    # so the stopping point does not depend on the number of workers. The
+    # interval is looked at after every batch once min_games are in, so it
+    # uses the boundary of sequential_z over all the looks max_games allows
+    # instead of z itself. The count of the result is the number of games
+    # used, deals in duplicate mode, and its hands the hands played.
+    sizes: List[int] = shard_sizes(max_games, batch_size)
+    num_workers = min(num_workers or os.cpu_count() or 1, len(sizes))
+    looks: int = int((np.cumsum(sizes) >= min_games).sum())
+    boundary: float = sequential_z(z, looks)
+
+    result: PayoffStats = PayoffStats(num_players)
+    with ShardPool(agents, num_players, num_workers) as pool:
+        for start in range(0, len(sizes), num_workers):
+            tasks: List[Tuple[int, int, int, bool]] = [
+                (seed, shard, sizes[shard], duplicate)
+                for shard in range(start, min(start + num_workers, len(sizes)))
+            ]
+            for stats in pool.map(tasks):
+                result.merge(stats)
+                if result.count < min_games:
+                    continue
+
+                low, high = result.confidence_interval(boundary)
+                if target_width is not None:
+                    if high[seat] - low[seat] < target_width:
+                        return result
+                if stop_on_sign and (low[seat] > 0 or high[seat] < 0):
+                    return result
+    return result
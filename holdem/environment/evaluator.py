@@ -0,0 +1,298 @@
+from collections import OrderedDict
+from typing import Dict, List, Sequence
+
+# Card ids follow card_map: suit-major, with ranks ordered A, 2, ..., K
+# inside every suit. Internally ranks are re-ordered so that 0 is a deuce
+# and 12 is an ace, which makes rank comparison a plain integer comparison.
+num_ranks: int = 13
+num_suits: int = 4
+num_cards: int = num_ranks * num_suits
+
+# A strength packs the hand category above five 4-bit tie-break ranks, so
+# comparing two strengths compares category first and kickers after.
+category_shift: int = 20
+
+STRAIGHT_FLUSH: int = 9
+FOUR_OF_A_KIND: int = 8
+FULL_HOUSE: int = 7
+FLUSH: int = 6
+STRAIGHT: int = 5
+THREE_OF_A_KIND: int = 4
+TWO_PAIRS: int = 3
+ONE_PAIR: int = 2
+HIGH_CARD: int = 1
+
+
+def card_rank(card: int) -> int:
+    return (card % num_ranks + num_ranks - 1) % num_ranks
+
+
+def card_suit(card: int) -> int:
+    return card // num_ranks
+
+
+def pack_strength(category: int, ranks: Sequence[int]) -> int:
+    result: int = category
+    for i in range(5):
+        result = (result << 4) | (ranks[i] if i < len(ranks) else 0)
+    return result
+
+
+def strength_category(strength: int) -> int:
+    return strength >> category_shift
+
+
+def strength_ranks(strength: int) -> List[int]:
+    return [(strength >> (4 * i)) & 0xF for i in reversed(range(5))]
+
+
+def straight_high(mask: int) -> int:
+    for high in range(num_ranks - 1, 3, -1):
+        straight: int = 0x1F << (high - 4)
+        if mask & straight == straight:
+            return high
+
+    wheel: int = (1 << 12) | 0xF
+    if mask & wheel == wheel:
+        return 3
+    return -1
+
+
+def high_ranks(mask: int, count: int) -> List[int]:
+    result: List[int] = []
+    for rank in reversed(range(num_ranks)):
+        if len(result) == count:
+            break
+        if mask & (1 << rank):
+            result.append(rank)
+    return result
+
+
+def __flush_strength(mask: int) -> int:
+    high: int = straight_high(mask)
+    if high >= 0:
+        return pack_strength(STRAIGHT_FLUSH, [high])
+    return pack_strength(FLUSH, high_ranks(mask, 5))
+
+
+def __unsuited_strength(counts: List[int]) -> int:
+    # groups[n] holds the ranks seen exactly n times, highest first
+    groups: List[List[int]] = [[], [], [], [], []]
+    present: List[int] = []
+    mask: int = 0
+    for rank in reversed(range(num_ranks)):
+        if counts[rank]:
+            groups[counts[rank]].append(rank)
+            present.append(rank)
+            mask |= 1 << rank
+
+    if groups[4]:
+        quad: int = groups[4][0]
+        return pack_strength(
+            FOUR_OF_A_KIND, [quad] + [r for r in present if r != quad][:1]
+        )
+    if groups[3] and len(groups[3]) + len(groups[2]) > 1:
+        trip: int = groups[3][0]
+        pair: int = max(groups[3][1:] + groups[2])
+        return pack_strength(FULL_HOUSE, [trip, pair])
+
+    high: int = straight_high(mask)
+    if high >= 0:
+        return pack_strength(STRAIGHT, [high])
+
+    if groups[3]:
+        trip = groups[3][0]
+        return pack_strength(
+            THREE_OF_A_KIND, [trip] + [r for r in present if r != trip][:2]
+        )
+    if len(groups[2]) > 1:
+        pairs: List[int] = groups[2][:2]
+        return pack_strength(
+            TWO_PAIRS, pairs + [r for r in present if r not in pairs][:1]
+        )
+    if groups[2]:
+        pair = groups[2][0]
+        return pack_strength(
+            ONE_PAIR, [pair] + [r for r in present if r != pair][:3]
+        )
+    return pack_strength(HIGH_CARD, present[:5])
+
+
+def __build_unsuited_lookup() -> Dict[int, int]:
+    lookup: Dict[int, int] = {}
+    counts: List[int] = [0 for _ in range(num_ranks)]
+
+    def visit(rank: int, size: int, key: int) -> None:
+        if rank < 0:
+            if size > 0:
+                lookup[key] = __unsuited_strength(counts)
+            return
+        for count in range(min(4, 7 - size) + 1):
+            counts[rank] = count
+            visit(rank - 1, size + count, key + count * rank_key_lookup[rank])
+        counts[rank] = 0
+
+    visit(num_ranks - 1, 0, 0)
+    return lookup
+
+
+# Per card id lookups, so the hot loop never does any arithmetic on ids.
+card_rank_lookup: List[int] = [card_rank(card) for card in range(num_cards)]
+card_suit_lookup: List[int] = [card_suit(card) for card in range(num_cards)]
+card_bit_lookup: List[int] = [1 << rank for rank in card_rank_lookup]
+
+# Every rank contributes a base-5 digit, so summing the keys of up to seven
+# cards gives a unique key for the rank multiset.
+rank_key_lookup: List[int] = [5**rank for rank in range(num_ranks)]
+card_key_lookup: List[int] = [rank_key_lookup[r] for r in card_rank_lookup]
+card_mask_lookup: List[int] = [1 << card for card in range(num_cards)]
+
+popcount_lookup: List[int] = [bin(mask).count("1") for mask in range(8192)]
+flush_lookup: List[int] = [
+    __flush_strength(mask) if popcount_lookup[mask] >= 5 else 0
+    for mask in range(8192)
+]
+unsuited_lookup: Dict[int, int] = __build_unsuited_lookup()
+
+
+def evaluate_cards(cards: Sequence[int]) -> int:
+    # With at most seven cards a flush rules out quads and full houses, so
+    # a suit holding five or more cards decides the hand on its own.
+    key: int = 0
+    suit_masks: List[int] = [0, 0, 0, 0]
+    for card in cards:
+        key += card_key_lookup[card]
+        suit_masks[card_suit_lookup[card]] |= card_bit_lookup[card]
+
+    for mask in suit_masks:
+        if popcount_lookup[mask] >= 5:
+            return flush_lookup[mask]
+    return unsuited_lookup[key]
+
+
+class EvaluationCache:
+    def __init__(self, capacity: int = 1 << 16) -> None:
+        self.capacity: int = capacity
+        self.hits: int = 0
+        self.misses: int = 0
+        # strengths keyed by the 52-bit mask of the cards, least recently
+        # used first
+        self.__entries: OrderedDict[int, int] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def evaluate(self, cards: Sequence[int]) -> int:
+        mask: int = 0
+        for card in cards:
+            mask |= card_mask_lookup[card]
+
+        strength: int | None = self.__entries.get(mask)
+        if strength is not None:
+            self.hits += 1
+            self.__entries.move_to_end(mask)
+            return strength
+
+        self.misses += 1
+        strength = evaluate_cards(cards)
+        self.__entries[mask] = strength
+        while len(self.__entries) > self.capacity:
+            self.__entries.popitem(last=False)
+        return strength
+
+    def clear(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.__entries.clear()
+
+
+# Shared by Hand and compare_hands, where the same card sets come up again.
+# Random board completions almost never repeat, so samplers call
+# evaluate_cards directly. Every process holds its own copy, so counters
+# read in a pool worker are per worker.
+evaluation_cache: EvaluationCache = EvaluationCache()
+
+
+class IncrementalEvaluator:
+    def __init__(self, cards: Sequence[int] = ()) -> None:
+        # running base-5 rank key and one 13-bit rank mask per suit, the
+        # same state evaluate_cards builds from scratch
+        self.key: int = 0
+        self.suit_masks: List[int] = [0, 0, 0, 0]
+        self.cards: List[int] = []
+        for card in cards:
+            self.add_card(card)
+
+    def add_card(self, card: int) -> None:
+        self.key += card_key_lookup[card]
+        self.suit_masks[card_suit_lookup[card]] |= card_bit_lookup[card]
+        self.cards.append(card)
+
+    def remove_card(self, card: int) -> None:
+        self.key -= card_key_lookup[card]
+        self.suit_masks[card_suit_lookup[card]] &= ~card_bit_lookup[card]
+        self.cards.remove(card)
+
+    def copy(self) -> "IncrementalEvaluator":
+        result: IncrementalEvaluator = IncrementalEvaluator()
+        result.key = self.key
+        result.suit_masks = list(self.suit_masks)
+        result.cards = list(self.cards)
+        return result
+
+    def strength(self) -> int:
+        for mask in self.suit_masks:
+            if popcount_lookup[mask] >= 5:
+                return flush_lookup[mask]
+        return unsuited_lookup[self.key]
+
+    def strength_with(self, card: int) -> int:
+        # strength after one more card, leaving this state untouched
+        suit: int = card_suit_lookup[card]
+        for i, mask in enumerate(self.suit_masks):
+            if i == suit:
+                mask |= card_bit_lookup[card]
+            if popcount_lookup[mask] >= 5:
+                return flush_lookup[mask]
+        return unsuited_lookup[self.key + card_key_lookup[card]]
+
+
+def best_five_cards(cards: Sequence[int], strength: int) -> List[int]:
+    category: int = strength_category(strength)
+    ranks: List[int] = strength_ranks(strength)
+
+    if category == STRAIGHT or category == STRAIGHT_FLUSH:
+        high: int = ranks[0]
+        wanted: List[int] = [(high - i) % num_ranks for i in range(5)]
+        if high == 3:
+            wanted[-1] = num_ranks - 1
+    elif category == FOUR_OF_A_KIND:
+        wanted = [ranks[0]] * 4 + [ranks[1]]
+    elif category == FULL_HOUSE:
+        wanted = [ranks[0]] * 3 + [ranks[1]] * 2
+    elif category == THREE_OF_A_KIND:
+        wanted = [ranks[0]] * 3 + ranks[1:3]
+    elif category == TWO_PAIRS:
+        wanted = [ranks[0]] * 2 + [ranks[1]] * 2 + [ranks[2]]
+    elif category == ONE_PAIR:
+        wanted = [ranks[0]] * 2 + ranks[1:4]
+    else:
+        wanted = ranks
+
+    candidates: List[int] = list(cards)
+    if category == FLUSH or category == STRAIGHT_FLUSH:
+        counts: List[int] = [0, 0, 0, 0]
+        for card in candidates:
+            counts[card_suit_lookup[card]] += 1
+        suit: int = counts.index(max(counts))
+        candidates = [c for c in candidates if card_suit_lookup[c] == suit]
+
+    # Ordered from the least to the most significant card.
+    result: List[int] = []
+    for rank in wanted:
+        for card in candidates:
+            if card_rank_lookup[card] == rank and card not in result:
+                result.append(card)
+                break
+    result.reverse()
+    return result
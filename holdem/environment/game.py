@@ -1,12 +1,14 @@
 from enum import Enum, IntEnum
-import copy
+from functools import lru_cache
 import os
-from typing import Dict, List, Tuple
+from typing import Dict, List, Sequence, Tuple
 import json
+import numpy as np
 from numpy.random import RandomState
 
-from .compare import compare_hands
-from .card import Card, valid_rank, valid_suit
+from .compare import compare_cards
+from .hand import evaluate_batch
+from .card import index_map
 
 
 class HoldemPlayerStatus(Enum):
@@ -31,6 +33,12 @@ action_lookup = [
 
 num_actions = len(action_lookup)
 
+# Legal actions for every 4-bit mask, bit i standing for action_lookup[i].
+legal_action_lookup: List[List[HoldemPlayerAction]] = [
+    [action for action in action_lookup if mask & (1 << action)]
+    for mask in range(1 << num_actions)
+]
+
 HoldemGameState = Dict[
     str, List[str] | List[int] | int | List[HoldemPlayerAction]
 ]
@@ -40,22 +48,134 @@ def state_shape(num_players: int) -> List[List[int]]:
     return [[72] for _ in range(num_players)]
 
 
+def game_state_dtype(num_players: int) -> np.dtype:
+    # Hands and public cards are not stored: they are the first cards of the
+    # deck, in dealing order, up to the cursor.
+    return np.dtype(
+        [
+            ("deck", np.int8, (len(index_map),)),
+            ("cursor", np.int8),
+            ("preset", np.int8),
+            ("in_chips", np.int32, (num_players,)),
+            ("status", np.int8, (num_players,)),
+            ("player_raises", np.int32, (num_players,)),
+            ("have_raised", np.int8),
+            ("not_raised", np.int8),
+            ("raise_amount", np.int32),
+            ("turn_id", np.int8),
+            ("round_id", np.int8),
+            ("last_raises", np.int8, (4,)),
+        ]
+    )
+
+
+class BettingTable:
+    # The betting state of a round is the number of raises so far, the
+    # number of actions since the last raise and whether the player to act
+    # faces a bet. A state id packs the three, and the table maps each state
+    # to its legal actions and, heads-up, for every action to the state
+    # that follows. With more players whether the next player faces a bet
+    # depends on who called since the last raise, which the state does not
+    # hold, so there is no transition table.
+    def __init__(self, num_players: int, allowed_raise: int) -> None:
+        self.num_players: int = num_players
+        self.allowed_raise: int = allowed_raise
+        self.num_states: int = (allowed_raise + 1) * (num_players + 1) * 2
+
+        self.raise_counts: np.ndarray = np.zeros(self.num_states, np.int32)
+        self.pass_counts: np.ndarray = np.zeros(self.num_states, np.int32)
+        self.facing: np.ndarray = np.zeros(self.num_states, dtype=bool)
+        self.legal_masks: np.ndarray = np.zeros(self.num_states, np.uint8)
+        self.round_over: np.ndarray = np.zeros(self.num_states, dtype=bool)
+        # -1 marks a raise past the cap, the only action without a successor
+        self.transitions: np.ndarray | None = None
+        if num_players == 2:
+            self.transitions = np.full(
+                (self.num_states, num_actions), -1, dtype=np.int16
+            )
+
+        for have_raised in range(allowed_raise + 1):
+            for not_raised in range(num_players + 1):
+                for facing in (False, True):
+                    state: int = self.encode(have_raised, not_raised, facing)
+                    self.raise_counts[state] = have_raised
+                    self.pass_counts[state] = not_raised
+                    self.facing[state] = facing
+                    self.round_over[state] = not_raised >= num_players
+
+                    mask: int = 1 << HoldemPlayerAction.FOLD
+                    if facing:
+                        mask |= 1 << HoldemPlayerAction.CALL
+                    else:
+                        mask |= 1 << HoldemPlayerAction.CHECK
+                    if have_raised < allowed_raise:
+                        mask |= 1 << HoldemPlayerAction.RAISE
+                    self.legal_masks[state] = mask
+                    if self.transitions is None:
+                        continue
+
+                    # heads-up a call or a check leaves the other player
+                    # level with the bet, and a raise puts them behind it
+                    passed: int = min(not_raised + 1, num_players)
+                    transition: np.ndarray = self.transitions[state]
+                    transition[HoldemPlayerAction.CALL] = self.encode(
+                        have_raised, passed, False
+                    )
+                    transition[HoldemPlayerAction.CHECK] = self.encode(
+                        have_raised, passed, False
+                    )
+                    transition[HoldemPlayerAction.FOLD] = state
+                    if have_raised < allowed_raise:
+                        transition[HoldemPlayerAction.RAISE] = self.encode(
+                            have_raised + 1, 1, True
+                        )
+
+        self.legal_flags: np.ndarray = (
+            self.legal_masks[:, None] >> np.arange(num_actions) & 1
+        ).astype(bool)
+
+        # plain lists for the scalar engine, where numpy indexing is slow
+        self.legal_mask_lookup: List[int] = self.legal_masks.tolist()
+        self.transition_lookup: List[List[int]] | None = (
+            None if self.transitions is None else self.transitions.tolist()
+        )
+        self.raise_count_lookup: List[int] = self.raise_counts.tolist()
+        self.pass_count_lookup: List[int] = self.pass_counts.tolist()
+
+    def encode(self, have_raised: int, not_raised: int, facing: bool) -> int:
+        return (have_raised * (self.num_players + 1) + not_raised) * 2 + int(
+            facing
+        )
+
+    def decode(self, state: int) -> Tuple[int, int, bool]:
+        return (
+            self.raise_count_lookup[state],
+            self.pass_count_lookup[state],
+            bool(self.facing[state]),
+        )
+
+
+@lru_cache(maxsize=None)
+def betting_table(num_players: int, allowed_raise: int) -> BettingTable:
+    return BettingTable(num_players, allowed_raise)
+
+
 class HoldemPlayer:
     def __init__(self, player_id: int) -> None:
         self.player_id: int = player_id
-        self.hand: List[Card] = []
+        self.hand: List[int] = []
         self.status: HoldemPlayerStatus = HoldemPlayerStatus.ALIVE
         self.in_chips: int = 0
 
     def get_state(
         self,
-        public_cards: List[Card],
+        public_cards: List[int],
         all_chips: List[int],
         legal_actions: List[HoldemPlayerAction],
     ) -> HoldemGameState:
         return {
-            "hand": [c.index() for c in self.hand],
-            "public_cards": [c.index() for c in public_cards],
+            "hand": [index_map[c] for c in self.hand],
+            "public_cards": [index_map[c] for c in public_cards],
             "all_chips": all_chips,
             "my_chips": self.in_chips,
             "legal_actions": legal_actions,
@@ -75,6 +195,7 @@ class HoldemRound:
         self.have_raised: int = 0
         self.not_raised: int = 0
         self.turn_id: int = 0
+        self.betting: BettingTable = betting_table(num_players, allowed_raise)
 
         self.player_raises: List[int] = [0 for _ in range(self.num_players)]
 
@@ -85,35 +206,64 @@ class HoldemRound:
         if raises:
             self.player_raises = raises
         else:
-            self.player_raises = [0 for _ in range(self.num_players)]
+            for i in range(self.num_players):
+                self.player_raises[i] = 0
 
     def proceed(
-        self, players: List[HoldemPlayer], action: HoldemPlayerAction
+        self,
+        players: List[HoldemPlayer],
+        action: HoldemPlayerAction,
+        change_log: List[int] | None = None,
     ) -> int:
+        if change_log is not None:
+            player: HoldemPlayer = players[self.turn_id]
+            change_log.extend(
+                (
+                    self.turn_id,
+                    self.player_raises[self.turn_id],
+                    player.in_chips,
+                    player.status.value,
+                    self.have_raised,
+                    self.not_raised,
+                )
+            )
+
+        highest: int
+        if self.betting.transition_lookup is not None:
+            # heads-up the table gives the next state, and the bet to match
+            # is the one of the other player
+            state: int = self.betting.transition_lookup[self.betting_state()][
+                action
+            ]
+            assert state >= 0
+            self.have_raised = self.betting.raise_count_lookup[state]
+            self.not_raised = self.betting.pass_count_lookup[state]
+            highest = self.player_raises[1 - self.turn_id]
+        else:
+            match action:
+                case HoldemPlayerAction.RAISE:
+                    assert self.have_raised < self.allowed_raise
+                    self.have_raised += 1
+                    self.not_raised = 1
+                case HoldemPlayerAction.CALL | HoldemPlayerAction.CHECK:
+                    self.not_raised += 1
+            highest = max(self.player_raises)
+
         match action:
             case HoldemPlayerAction.CALL:
-                diff: int = (
-                    max(self.player_raises) - self.player_raises[self.turn_id]
-                )
-                self.player_raises[self.turn_id] = max(self.player_raises)
+                diff: int = highest - self.player_raises[self.turn_id]
+                self.player_raises[self.turn_id] = highest
                 players[self.turn_id].in_chips += diff
-                self.not_raised += 1
             case HoldemPlayerAction.RAISE:
                 diff: int = (
-                    max(self.player_raises)
+                    highest
                     - self.player_raises[self.turn_id]
                     + self.raise_amount
                 )
-                self.player_raises[self.turn_id] = (
-                    max(self.player_raises) + self.raise_amount
-                )
+                self.player_raises[self.turn_id] = highest + self.raise_amount
                 players[self.turn_id].in_chips += diff
-                self.have_raised += 1
-                self.not_raised = 1
             case HoldemPlayerAction.FOLD:
                 players[self.turn_id].status = HoldemPlayerStatus.FOLDED
-            case HoldemPlayerAction.CHECK:
-                self.not_raised += 1
 
         self.turn_id = (self.turn_id + 1) % self.num_players
         while players[self.turn_id].status == HoldemPlayerStatus.FOLDED:
@@ -121,21 +271,24 @@ class HoldemRound:
 
         return self.turn_id
 
-    def legal_actions(self) -> List[HoldemPlayerAction]:
-        available_actions: List[HoldemPlayerAction] = copy.deepcopy(
-            action_lookup
+    def betting_state(self) -> int:
+        highest: int = (
+            self.player_raises[1 - self.turn_id]
+            if self.num_players == 2
+            else max(self.player_raises)
+        )
+        return self.betting.encode(
+            self.have_raised,
+            min(self.not_raised, self.num_players),
+            self.player_raises[self.turn_id] < highest,
         )
 
-        if self.have_raised >= self.allowed_raise:
-            available_actions.remove(HoldemPlayerAction.RAISE)
-
-        if self.player_raises[self.turn_id] < max(self.player_raises):
-            available_actions.remove(HoldemPlayerAction.CHECK)
-
-        if self.player_raises[self.turn_id] == max(self.player_raises):
-            available_actions.remove(HoldemPlayerAction.CALL)
+    def legal_mask(self) -> int:
+        return self.betting.legal_mask_lookup[self.betting_state()]
 
-        return available_actions
+    def legal_actions(self) -> List[HoldemPlayerAction]:
+        # shared between calls, callers must not modify it
+        return legal_action_lookup[self.legal_mask()]
 
     def is_over(self) -> bool:
         return self.not_raised >= self.num_players
@@ -146,17 +299,12 @@ class HoldemJudger:
         self.random: RandomState = random
 
     def judge(
-        self, players: List[HoldemPlayer], hands: List[List[Card] | None]
+        self, players: List[HoldemPlayer], hands: List[List[int] | None]
     ) -> List[int]:
-        hands_converted: List[List[str] | None] = [
-            [card.index() for card in hand] if hand is not None else None
-            for hand in hands
-        ]
-
-        winners: List[int] = compare_hands(hands_converted)
+        winners: List[int] = compare_cards(hands)
 
         in_chips: List[int] = [p.in_chips for p in players]
-        profits = self.__split_pots(copy.deepcopy(in_chips), winners)
+        profits = self.__split_pots(in_chips, winners)
 
         payoffs: List[int] = []
         for i, _ in enumerate(players):
@@ -164,43 +312,70 @@ class HoldemJudger:
 
         return payoffs
 
-    def __split_pot(
-        self, in_chips: List[int], winners: List[int]
-    ) -> Tuple[List[int], List[int]]:
-        winner_count: int = sum(
-            (winners[i] and in_chips[i] > 0) for i in range(len(in_chips))
+    def judge_batch(
+        self, in_chips: np.ndarray, winners: np.ndarray
+    ) -> np.ndarray:
+        # The rules of judge over (games, players) arrays of contributions
+        # and winner flags. Odd chips go to a uniformly drawn winner of their
+        # layer as well, though not from the same random stream as judge.
+        chips: np.ndarray = np.asarray(in_chips, dtype=np.int64)
+        winners = np.asarray(winners, dtype=bool) & (chips > 0)
+        num_games, num_players = chips.shape
+        rows: np.ndarray = np.arange(num_games)[:, None]
+        positions: np.ndarray = np.arange(num_players)
+
+        # Layer j spans the j-th and the previous sorted contribution. Ties
+        # give empty layers, and every layer counts the players and winners
+        # from the first position of its level on.
+        order: np.ndarray = np.argsort(chips, axis=1, kind="stable")
+        levels: np.ndarray = chips[rows, order]
+        bets: np.ndarray = np.diff(levels, axis=1, prepend=0)
+        active: np.ndarray = bets > 0
+        first: np.ndarray = np.maximum.accumulate(
+            np.where(active, positions, 0), axis=1
+        )
+        player_counts: np.ndarray = num_players - first
+        winner_suffix: np.ndarray = np.cumsum(
+            winners[rows, order][:, ::-1], axis=1
+        )[:, ::-1]
+        winner_counts: np.ndarray = np.take_along_axis(
+            winner_suffix, first, axis=1
         )
-        player_count: int = sum(in_chips[i] > 0 for i in range(len(in_chips)))
-
-        if winner_count == 0 or winner_count == player_count:
-            earns: List[int] = copy.deepcopy(in_chips)
-            remains: List[int] = [0 for _ in range(len(in_chips))]
-        else:
-            bet: int = min(v for v in in_chips if v > 0)
-            earn: int
-            remaining: int
-            earn, remaining = divmod(bet * player_count, winner_count)
-
-            earns: List[int] = [0 for _ in range(len(in_chips))]
-            remains: List[int] = copy.deepcopy(in_chips)
-            for i in range(len(in_chips)):
-                if in_chips[i] == 0:
-                    continue
-                if winners[i]:
-                    earns[i] += earn
-                remains[i] -= bet
 
-            if remaining > 0:
-                random_winner = self.random.choice(
-                    [
-                        i
-                        for i in range(len(winners))
-                        if winners[i] and in_chips[i] > 0
-                    ]
-                )
-                earns[random_winner] += remaining
+        # Once a layer has no winner, or only winners, every later layer
+        # goes back to the players who paid it.
+        settled: np.ndarray = np.logical_or.accumulate(
+            active & ((winner_counts == 0) | (winner_counts == player_counts)),
+            axis=1,
+        )
+        earn, remaining = np.divmod(
+            bets * player_counts, np.maximum(winner_counts, 1)
+        )
 
-        return earns, remains
+        in_layer: np.ndarray = (
+            chips[:, None, :] >= levels[:, :, None]
+        ) & active[:, :, None]
+        shares: np.ndarray = np.where(
+            settled[:, :, None],
+            bets[:, :, None],
+            earn[:, :, None] * winners[:, None, :],
+        )
+        earns: np.ndarray = (shares * in_layer).sum(axis=1)
+
+        odd: np.ndarray = active & ~settled & (remaining > 0)
+        games, layers = np.nonzero(odd)
+        if len(games) > 0:
+            eligible: np.ndarray = in_layer[games, layers] & winners[games]
+            keys: np.ndarray = np.where(
+                eligible, self.random.rand(len(games), num_players), -1
+            )
+            np.add.at(
+                earns,
+                (games, keys.argmax(axis=1)),
+                remaining[games, layers],
+            )
+
+        return earns - chips
 
     def __split_pots(
         self, in_chips: List[int], winners: List[int]
@@ -208,11 +383,48 @@ class HoldemJudger:
         assert len(in_chips) == len(winners)
         assert sum(winners) >= 1
 
+        # Walking the contributions upwards visits the pot layers in order:
+        # each layer is the gap to the next contribution, paid by every
+        # player still in, and players drop out once their level is paid.
+        order: List[int] = sorted(
+            (i for i in range(len(in_chips)) if in_chips[i] > 0),
+            key=in_chips.__getitem__,
+        )
         earns: List[int] = [0 for _ in range(len(in_chips))]
-        while any(v > 0 for v in in_chips):
-            profits: List[int]
-            profits, in_chips = self.__split_pot(in_chips, winners)
-            earns = [earns[i] + profits[i] for i in range(len(in_chips))]
+        player_count: int = len(order)
+        winner_count: int = sum(bool(winners[i]) for i in order)
+        # what every winner still in has earned so far
+        share: int = 0
+        level: int = 0
+        position: int = 0
+        while position < len(order):
+            if winner_count == 0 or winner_count == player_count:
+                # nothing left to win, the rest goes back to its owners
+                for i in order[position:]:
+                    earns[i] += in_chips[i] - level
+                    if winners[i]:
+                        earns[i] += share
+                return earns
+
+            bet: int = in_chips[order[position]] - level
+            earn: int
+            remaining: int
+            earn, remaining = divmod(bet * player_count, winner_count)
+            share += earn
+            if remaining > 0:
+                random_winner = self.random.choice(
+                    sorted(i for i in order[position:] if winners[i])
+                )
+                earns[random_winner] += remaining
+
+            level += bet
+            while position < len(order) and in_chips[order[position]] == level:
+                i: int = order[position]
+                player_count -= 1
+                if winners[i]:
+                    winner_count -= 1
+                    earns[i] += share
+                position += 1
 
         return earns
 
@@ -220,16 +432,48 @@ class HoldemJudger:
 class HoldemDealer:
     def __init__(self, random: RandomState = RandomState()) -> None:
         self.random: RandomState = random
-        self.deck: List[Card] = [
-            Card(suit, rank) for suit in valid_suit[:4] for rank in valid_rank
-        ]
-        self.shuffle()
-
-    def shuffle(self) -> None:
-        self.random.shuffle(self.deck)
-
-    def deal(self) -> Card:
-        return self.deck.pop()
+        self.deck: np.ndarray = np.arange(len(index_map), dtype=np.int8)
+        self.cursor: int = 0
+        # the first preset cards of the deck are dealt as they lie
+        self.preset: int = 0
+        # where the last card dealt was taken from, for undeal
+        self.last_swap: int = 0
+
+    def shuffle(self, cards: Sequence[int] | None = None) -> None:
+        # Cards are drawn with a lazy Fisher-Yates shuffle, so starting a new
+        # deal only rewinds the cursor over the previous permutation. Cards
+        # given here are moved to the top and come out first, in order.
+        self.cursor = 0
+        self.preset = 0
+        if cards is not None:
+            for i, card in enumerate(cards):
+                position: int = int(np.flatnonzero(self.deck == card)[0])
+                assert position >= i
+                self.deck[position] = self.deck[i]
+                self.deck[i] = card
+            self.preset = len(cards)
+
+    def deal(self) -> int:
+        if self.cursor < self.preset:
+            self.last_swap = self.cursor
+            self.cursor += 1
+            return int(self.deck[self.cursor - 1])
+
+        swap: int = self.random.randint(self.cursor, len(self.deck))
+        card: int = int(self.deck[swap])
+        self.deck[swap] = self.deck[self.cursor]
+        self.deck[self.cursor] = card
+        self.last_swap = swap
+        self.cursor += 1
+        return card
+
+    def undeal(self, swap: int) -> None:
+        # Takes back the last card dealt, swapping it back to where deal
+        # found it, so the deck is left as it was before.
+        self.cursor -= 1
+        card: int = int(self.deck[self.cursor])
+        self.deck[self.cursor] = self.deck[swap]
+        self.deck[swap] = card
 
 
 class HoldemGame:
@@ -250,25 +494,52 @@ class HoldemGame:
 
         self.num_players = num_players
 
-        self.dealer: HoldemDealer | None = None
+        self.dealer: HoldemDealer = HoldemDealer(self.random)
         self.players: List[HoldemPlayer] | None = None
-        self.judger: HoldemJudger | None = None
-        self.public_cards: List[Card] | None = None
+        self.judger: HoldemJudger = HoldemJudger(self.random)
+        self.public_cards: List[int] | None = None
         self.turn_id: int = 0
         self.round: HoldemRound | None = None
         self.round_id: int = 0
         self.last_raises: List[int] = [0 for _ in range(4)]
 
-    def reset(self) -> Tuple[HoldemGameState, int]:
-        self.dealer = HoldemDealer(self.random)
+        self.state_dtype: np.dtype = game_state_dtype(num_players)
+        # Flat stack of ints written by apply and consumed by undo. Every
+        # entry ends with a flag telling whether the action closed a round.
+        self.change_log: List[int] = []
+
+    def seed(self, seed: int | List[int]) -> None:
+        # Reseeds the shared random state in place and puts the deck back in
+        # order, so the hands that follow depend on the seed alone.
+        self.random.seed(seed)
+        self.dealer.deck[:] = np.arange(len(self.dealer.deck))
+        self.dealer.cursor = 0
+        self.dealer.preset = 0
+
+    def reset(
+        self,
+        cards: Sequence[int] | None = None,
+        small_starter: int | None = None,
+    ) -> Tuple[HoldemGameState, int]:
+        self.start(cards, small_starter)
+        return self.get_state(self.turn_id), self.turn_id
+
+    def start(
+        self,
+        cards: Sequence[int] | None = None,
+        small_starter: int | None = None,
+    ) -> int:
+        # cards fixes the deal order: the hole cards round by round, then
+        # the board; the blinds are drawn unless small_starter is given
+        self.dealer.shuffle(cards)
         self.players = [HoldemPlayer(i) for i in range(self.num_players)]
-        self.judger = HoldemJudger(self.random)
 
         for i in range(2 * self.num_players):
             self.players[i % self.num_players].hand.append(self.dealer.deal())
         self.public_cards = []
 
-        small_starter: int = self.random.randint(0, self.num_players)
+        if small_starter is None:
+            small_starter = self.random.randint(0, self.num_players)
         big_starter: int = (small_starter + 1) % self.num_players
         self.players[big_starter].in_chips = self.big_blind
         self.players[small_starter].in_chips = self.small_blind
@@ -286,32 +557,143 @@ class HoldemGame:
         self.round_id = 0
 
         self.last_raises = [0 for _ in range(4)]
+        self.change_log.clear()
 
-        return self.get_state(self.turn_id), self.turn_id
+        return self.turn_id
 
     def step(self, action: HoldemPlayerAction) -> Tuple[HoldemGameState, int]:
+        self.apply(action)
+        state = self.get_state(self.turn_id)
+        return state, self.turn_id
+
+    def apply(self, action: HoldemPlayerAction) -> int:
         assert self.round is not None
-        assert self.dealer is not None
         assert self.public_cards is not None
         assert self.players is not None
 
-        self.turn_id = self.round.proceed(self.players, action)
+        self.turn_id = self.round.proceed(
+            self.players, action, self.change_log
+        )
+        self.change_log.append(self.last_raises[self.round_id])
         self.last_raises[self.round_id] = self.round.have_raised
-        if self.round.is_over():
-            if self.round_id == 0:
-                self.public_cards.append(self.dealer.deal())
-                self.public_cards.append(self.dealer.deal())
-                self.public_cards.append(self.dealer.deal())
-            elif self.round_id <= 2:
-                self.public_cards.append(self.dealer.deal())
-            if self.round_id == 1:
-                self.round.raise_amount = 2 * self.raise_amount
-
-            self.round_id += 1
-            self.round.new_round(self.turn_id)
+        if not self.round.is_over():
+            self.change_log.append(0)
+            return self.turn_id
+
+        self.change_log.extend(self.round.player_raises)
+        self.change_log.extend(
+            (
+                self.round.have_raised,
+                self.round.not_raised,
+                self.round.raise_amount,
+            )
+        )
 
-        state = self.get_state(self.turn_id)
-        return state, self.turn_id
+        dealt: int = 0
+        if self.round_id == 0:
+            dealt = 3
+        elif self.round_id <= 2:
+            dealt = 1
+        for _ in range(dealt):
+            self.public_cards.append(self.dealer.deal())
+            self.change_log.append(self.dealer.last_swap)
+        self.change_log.extend((dealt, 1))
+        if self.round_id == 1:
+            self.round.raise_amount = 2 * self.raise_amount
+
+        self.round_id += 1
+        self.round.new_round(self.turn_id)
+        return self.turn_id
+
+    def undo(self) -> int:
+        assert self.round is not None
+        assert self.public_cards is not None
+        assert self.players is not None
+
+        log: List[int] = self.change_log
+        if log.pop():
+            # The round was closed: put the cards back on the deck and
+            # restore the betting state the round ended with.
+            for _ in range(log.pop()):
+                self.public_cards.pop()
+                self.dealer.undeal(log.pop())
+            self.round.raise_amount = log.pop()
+            self.round.not_raised = log.pop()
+            self.round.have_raised = log.pop()
+            for i in reversed(range(self.num_players)):
+                self.round.player_raises[i] = log.pop()
+            self.round_id -= 1
+
+        self.last_raises[self.round_id] = log.pop()
+
+        self.round.not_raised = log.pop()
+        self.round.have_raised = log.pop()
+        status: int = log.pop()
+        in_chips: int = log.pop()
+        player_raise: int = log.pop()
+        self.turn_id = log.pop()
+
+        player: HoldemPlayer = self.players[self.turn_id]
+        player.status = HoldemPlayerStatus(status)
+        player.in_chips = in_chips
+        self.round.player_raises[self.turn_id] = player_raise
+        self.round.turn_id = self.turn_id
+        return self.turn_id
+
+    def snapshot(self, out: np.ndarray | None = None) -> np.ndarray:
+        assert self.round is not None
+        assert self.players is not None
+
+        state: np.ndarray = (
+            np.zeros((), dtype=self.state_dtype) if out is None else out
+        )
+        state["deck"] = self.dealer.deck
+        state["cursor"] = self.dealer.cursor
+        state["preset"] = self.dealer.preset
+        state["in_chips"] = [p.in_chips for p in self.players]
+        state["status"] = [p.status.value for p in self.players]
+        state["player_raises"] = self.round.player_raises
+        state["have_raised"] = self.round.have_raised
+        state["not_raised"] = self.round.not_raised
+        state["raise_amount"] = self.round.raise_amount
+        state["turn_id"] = self.turn_id
+        state["round_id"] = self.round_id
+        state["last_raises"] = self.last_raises
+        return state
+
+    def restore(self, state: np.ndarray | bytes) -> None:
+        if isinstance(state, bytes):
+            state = np.frombuffer(state, dtype=self.state_dtype)[0]
+
+        self.dealer.deck[:] = state["deck"]
+        self.dealer.cursor = int(state["cursor"])
+        self.dealer.preset = int(state["preset"])
+        deck: List[int] = self.dealer.deck[: self.dealer.cursor].tolist()
+
+        if self.players is None:
+            self.players = [HoldemPlayer(i) for i in range(self.num_players)]
+        for i, player in enumerate(self.players):
+            player.hand = deck[i : 2 * self.num_players : self.num_players]
+            player.status = HoldemPlayerStatus(int(state["status"][i]))
+            player.in_chips = int(state["in_chips"][i])
+        self.public_cards = deck[2 * self.num_players :]
+
+        self.turn_id = int(state["turn_id"])
+        self.round_id = int(state["round_id"])
+        self.last_raises = state["last_raises"].tolist()
+
+        if self.round is None:
+            self.round = HoldemRound(
+                raise_amount=self.raise_amount,
+                allowed_raise=self.allowed_raise,
+                num_players=self.num_players,
+            )
+        self.round.turn_id = self.turn_id
+        self.round.player_raises = state["player_raises"].tolist()
+        self.round.have_raised = int(state["have_raised"])
+        self.round.not_raised = int(state["not_raised"])
+        self.round.raise_amount = int(state["raise_amount"])
+        self.change_log.clear()
 
     def get_state(self, player: int) -> HoldemGameState:
         assert self.players is not None
@@ -346,9 +728,8 @@ class HoldemGame:
     def payoffs(self) -> List[float]:
         assert self.players is not None
         assert self.public_cards is not None
-        assert self.judger is not None
 
-        hands: List[List[Card] | None] = []
+        hands: List[List[int] | None] = []
         for player in self.players:
             if player.status == HoldemPlayerStatus.ALIVE:
                 hands.append(player.hand + self.public_cards)
@@ -365,3 +746,190 @@ class HoldemGame:
         assert self.round is not None
 
         return self.round.legal_actions()
+
+    def legal_mask(self) -> int:
+        assert self.round is not None
+
+        return self.round.legal_mask()
+
+
+class VecHoldemGame:
+    # Plays num_games heads-up games side by side with the rules of
+    # HoldemGame. The nine cards of a deal are drawn up front in the order
+    # HoldemGame deals them: both hole cards alternating, then the board.
+    num_players: int = 2
+
+    def __init__(
+        self,
+        num_games: int,
+        small_blind: int = 1,
+        allowed_raise: int = 4,
+        random: RandomState = RandomState(),
+    ) -> None:
+        self.random: RandomState = random
+        self.num_games: int = num_games
+
+        self.small_blind: int = small_blind
+        self.big_blind: int = 2 * self.small_blind
+        self.raise_amount: int = self.big_blind
+        self.allowed_raise: int = allowed_raise
+
+        self.rows: np.ndarray = np.arange(num_games)
+        self.cards: np.ndarray = np.zeros((num_games, 9), dtype=np.int8)
+        self.in_chips: np.ndarray = np.zeros((num_games, 2), dtype=np.int32)
+        self.player_raises: np.ndarray = np.zeros(
+            (num_games, 2), dtype=np.int32
+        )
+        self.folded: np.ndarray = np.zeros((num_games, 2), dtype=bool)
+        self.betting: BettingTable = betting_table(2, allowed_raise)
+        assert self.betting.transitions is not None
+        self.betting_state: np.ndarray = np.zeros(num_games, dtype=np.int16)
+        self.round_raise: np.ndarray = np.zeros(num_games, dtype=np.int32)
+        self.round_id: np.ndarray = np.zeros(num_games, dtype=np.int32)
+        self.turn_id: np.ndarray = np.zeros(num_games, dtype=np.int32)
+        self.last_raises: np.ndarray = np.zeros((num_games, 4), dtype=np.int32)
+
+    def reset(self) -> np.ndarray:
+        self.reset_games(self.rows)
+        return self.turn_id
+
+    def reset_games(self, games: np.ndarray) -> None:
+        count: int = len(games)
+        rows: np.ndarray = np.arange(count)
+
+        deck: np.ndarray = np.tile(
+            np.arange(len(index_map), dtype=np.int8), (count, 1)
+        )
+        for i in range(self.cards.shape[1]):
+            swap: np.ndarray = i + (
+                self.random.rand(count) * (len(index_map) - i)
+            ).astype(np.int64)
+            card: np.ndarray = deck[rows, swap]
+            deck[rows, swap] = deck[rows, i]
+            deck[rows, i] = card
+        self.cards[games] = deck[:, : self.cards.shape[1]]
+
+        small_starter: np.ndarray = self.random.randint(0, 2, size=count)
+        big_starter: np.ndarray = 1 - small_starter
+        self.in_chips[games, small_starter] = self.small_blind
+        self.in_chips[games, big_starter] = self.big_blind
+        self.player_raises[games] = self.in_chips[games]
+        self.folded[games] = False
+        self.betting_state[games] = self.betting.encode(0, 0, True)
+        self.round_raise[games] = self.raise_amount
+        self.round_id[games] = 0
+        self.turn_id[games] = small_starter
+        self.last_raises[games] = 0
+
+    @property
+    def have_raised(self) -> np.ndarray:
+        return self.betting.raise_counts[self.betting_state]
+
+    @property
+    def not_raised(self) -> np.ndarray:
+        return self.betting.pass_counts[self.betting_state]
+
+    def legal_masks(self) -> np.ndarray:
+        return self.betting.legal_masks[self.betting_state]
+
+    def legal_actions(self) -> np.ndarray:
+        return self.betting.legal_flags[self.betting_state]
+
+    def public_cards(self) -> List[List[int]]:
+        visible: np.ndarray = np.array([0, 3, 4, 5, 5])[self.round_id]
+        return [
+            self.cards[i, 4 : 4 + visible[i]].tolist()
+            for i in range(self.num_games)
+        ]
+
+    def observations(self) -> np.ndarray:
+        # the encoding of Env, for the player to act in every game
+        obs: np.ndarray = np.zeros((self.num_games, 72), dtype=np.float32)
+        visible: np.ndarray = np.array([2, 5, 6, 7, 7])[self.round_id]
+        cards: np.ndarray = np.concatenate(
+            [
+                self.cards[self.rows, self.turn_id][:, None],
+                self.cards[self.rows, self.turn_id + 2][:, None],
+                self.cards[:, 4:],
+            ],
+            axis=1,
+        )
+        shown: np.ndarray = np.arange(7) < visible[:, None]
+        obs[np.nonzero(shown)[0], cards[shown]] = 1
+        obs[self.rows[:, None], 52 + 5 * np.arange(4) + self.last_raises] = 1
+        return obs
+
+    def step(
+        self, actions: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Illegal actions fall back to check, then to fold, like Env.step.
+        legal: np.ndarray = self.legal_actions()
+        actions = np.asarray(actions)
+        actions = np.where(
+            legal[self.rows, actions],
+            actions,
+            np.where(
+                legal[:, HoldemPlayerAction.CHECK],
+                HoldemPlayerAction.CHECK,
+                HoldemPlayerAction.FOLD,
+            ),
+        )
+        is_call: np.ndarray = actions == HoldemPlayerAction.CALL
+        is_raise: np.ndarray = actions == HoldemPlayerAction.RAISE
+        is_fold: np.ndarray = actions == HoldemPlayerAction.FOLD
+
+        turn: np.ndarray = self.turn_id
+        mine: np.ndarray = self.player_raises[self.rows, turn]
+        highest: np.ndarray = self.player_raises.max(axis=1)
+        target: np.ndarray = np.where(
+            is_raise,
+            highest + self.round_raise,
+            np.where(is_call, highest, mine),
+        )
+        self.in_chips[self.rows, turn] += target - mine
+        self.player_raises[self.rows, turn] = target
+        self.folded[self.rows, turn] |= is_fold
+        self.betting_state = self.betting.transitions[
+            self.betting_state, actions
+        ]
+        self.turn_id = 1 - turn
+        self.last_raises[self.rows, self.round_id] = self.have_raised
+
+        round_over: np.ndarray = self.betting.round_over[self.betting_state]
+        self.round_raise = np.where(
+            round_over & (self.round_id == 1),
+            2 * self.round_raise,
+            self.round_raise,
+        )
+        self.round_id += round_over
+        self.betting_state[round_over] = self.betting.encode(0, 0, False)
+        self.player_raises[round_over] = 0
+
+        dones: np.ndarray = self.folded.any(axis=1) | (self.round_id >= 4)
+        payoffs: np.ndarray = np.zeros((self.num_games, 2))
+        finished: np.ndarray = np.nonzero(dones)[0]
+        if len(finished) > 0:
+            payoffs[finished] = self.__payoffs(finished)
+            self.reset_games(finished)
+
+        return self.turn_id, payoffs, dones
+
+    def __payoffs(self, games: np.ndarray) -> np.ndarray:
+        # Heads-up, a hand is won for the smaller of the two contributions
+        # and any excess goes back to the bigger one.
+        cards: np.ndarray = self.cards[games]
+        _, first = evaluate_batch(cards[:, [0, 2, 4, 5, 6, 7, 8]])
+        _, second = evaluate_batch(cards[:, [1, 3, 4, 5, 6, 7, 8]])
+        folded: np.ndarray = self.folded[games]
+        sign: np.ndarray = np.select(
+            [
+                folded[:, 1],
+                folded[:, 0],
+                first > second,
+                first < second,
+            ],
+            [1, -1, 1, -1],
+            0,
+        )
+        won: np.ndarray = self.in_chips[games].min(axis=1) * sign
+        return np.stack([won, -won], axis=1) / self.big_blind
@@ -0,0 +1,195 @@
+from bisect import bisect_right
+from itertools import combinations_with_replacement, product
+from math import comb
+from typing import Dict, List, Sequence, Tuple
+
+from .evaluator import (
+    card_rank_lookup,
+    card_suit_lookup,
+    num_ranks,
+    num_suits,
+    popcount_lookup,
+)
+
+# Cards dealt per group, up to and including each round: the hole cards,
+# then the flop, the turn and the river.
+round_groups: List[List[int]] = [[2], [2, 3], [2, 3, 1], [2, 3, 1, 1]]
+
+CountVector = Tuple[int, ...]
+Configuration = Tuple[CountVector, ...]
+
+
+def combination_index(positions: Sequence[int]) -> int:
+    # colexicographic rank of a strictly increasing sequence
+    return sum(comb(position, i + 1) for i, position in enumerate(positions))
+
+
+def combination_positions(index: int, size: int) -> List[int]:
+    positions: List[int] = []
+    for k in range(size, 0, -1):
+        position: int = k - 1
+        while comb(position + 1, k) <= index:
+            position += 1
+        index -= comb(position, k)
+        positions.append(position)
+    positions.reverse()
+    return positions
+
+
+def profile_count(counts: CountVector) -> int:
+    result: int = 1
+    used: int = 0
+    for count in counts:
+        result *= comb(num_ranks - used, count)
+        used += count
+    return result
+
+
+def profile_index(ranks: List[List[int]]) -> int:
+    # Ranks of one suit, split by group. Each group picks its ranks among the
+    # ones the earlier groups left free in that suit.
+    index: int = 0
+    radix: int = 1
+    used: int = 0
+    for group in ranks:
+        group_index: int = 0
+        for i, rank in enumerate(sorted(group)):
+            position: int = rank - popcount_lookup[used & ((1 << rank) - 1)]
+            group_index += comb(position, i + 1)
+        index += group_index * radix
+        radix *= comb(num_ranks - popcount_lookup[used], len(group))
+        for rank in group:
+            used |= 1 << rank
+    return index
+
+
+def profile_ranks(index: int, counts: CountVector) -> List[List[int]]:
+    ranks: List[List[int]] = []
+    free: List[int] = list(range(num_ranks))
+    for count in counts:
+        index, group_index = divmod(index, comb(len(free), count))
+        group: List[int] = [
+            free[position]
+            for position in combination_positions(group_index, count)
+        ]
+        ranks.append(group)
+        free = [rank for rank in free if rank not in group]
+    return ranks
+
+
+def multiset_index(values: List[int]) -> int:
+    return combination_index([v + i for i, v in enumerate(sorted(values))])
+
+
+def multiset_values(index: int, size: int) -> List[int]:
+    positions: List[int] = combination_positions(index, size)
+    return [position - i for i, position in enumerate(positions)]
+
+
+class HandIndexer:
+    def __init__(self, round_id: int) -> None:
+        self.round_id: int = round_id
+        self.groups: List[int] = round_groups[round_id]
+
+        # A configuration lists the per-group card counts of every suit,
+        # ordered from the fullest suit down. Suits sharing the same counts
+        # are interchangeable, so their rank profiles form a multiset.
+        vectors: List[CountVector] = list(
+            product(*[range(count + 1) for count in self.groups])
+        )
+        self.configurations: List[Configuration] = []
+        for suits in combinations_with_replacement(vectors, num_suits):
+            configuration: Configuration = tuple(sorted(suits, reverse=True))
+            column_sums: List[int] = [sum(col) for col in zip(*configuration)]
+            if column_sums == self.groups:
+                self.configurations.append(configuration)
+        self.configurations.sort()
+
+        self.offsets: List[int] = []
+        self.configuration_lookup: Dict[Configuration, int] = {}
+        self.size: int = 0
+        for i, configuration in enumerate(self.configurations):
+            self.offsets.append(self.size)
+            self.configuration_lookup[configuration] = i
+            self.size += self.__configuration_size(configuration)
+
+    @staticmethod
+    def __suit_groups(
+        configuration: Configuration,
+    ) -> List[Tuple[CountVector, int]]:
+        result: List[Tuple[CountVector, int]] = []
+        for counts in configuration:
+            if result and result[-1][0] == counts:
+                result[-1] = (counts, result[-1][1] + 1)
+            else:
+                result.append((counts, 1))
+        return result
+
+    def __configuration_size(self, configuration: Configuration) -> int:
+        result: int = 1
+        for counts, size in self.__suit_groups(configuration):
+            result *= comb(profile_count(counts) + size - 1, size)
+        return result
+
+    def index(self, hole: Sequence[int], public: Sequence[int]) -> int:
+        cards: List[int] = list(hole) + list(public)
+        assert len(cards) == sum(self.groups)
+
+        ranks: List[List[List[int]]] = [
+            [[] for _ in self.groups] for _ in range(num_suits)
+        ]
+        start: int = 0
+        for group, count in enumerate(self.groups):
+            for card in cards[start : start + count]:
+                ranks[card_suit_lookup[card]][group].append(
+                    card_rank_lookup[card]
+                )
+            start += count
+
+        suits: List[Tuple[CountVector, int]] = sorted(
+            (
+                (tuple(len(group) for group in suit), profile_index(suit))
+                for suit in ranks
+            ),
+            reverse=True,
+        )
+        configuration: Configuration = tuple(counts for counts, _ in suits)
+
+        index: int = 0
+        radix: int = 1
+        start = 0
+        for counts, size in self.__suit_groups(configuration):
+            profiles: List[int] = [p for _, p in suits[start : start + size]]
+            index += multiset_index(profiles) * radix
+            radix *= comb(profile_count(counts) + size - 1, size)
+            start += size
+
+        configuration_id: int = self.configuration_lookup[configuration]
+        return self.offsets[configuration_id] + index
+
+    def unindex(self, index: int) -> Tuple[List[int], List[int]]:
+        assert 0 <= index < self.size
+
+        configuration_id: int = bisect_right(self.offsets, index) - 1
+        configuration: Configuration = self.configurations[configuration_id]
+        index -= self.offsets[configuration_id]
+
+        # The canonical representative deals the i-th suit of the
+        # configuration to suit i.
+        ranks: List[List[List[int]]] = []
+        for counts, size in self.__suit_groups(configuration):
+            index, group_index = divmod(
+                index, comb(profile_count(counts) + size - 1, size)
+            )
+            for profile in reversed(multiset_values(group_index, size)):
+                ranks.append(profile_ranks(profile, counts))
+
+        cards: List[List[int]] = [[] for _ in self.groups]
+        for suit, suit_ranks in enumerate(ranks):
+            for group, group_ranks in enumerate(suit_ranks):
+                cards[group] += [
+                    suit * num_ranks + (rank + 1) % num_ranks
+                    for rank in group_ranks
+                ]
+
+        return cards[0], [card for group in cards[1:] for card in group]
@@ -0,0 +1,326 @@
+import os
+import pickle
+import queue
+import random
+import traceback
+from collections import OrderedDict
+from multiprocessing import Process, Queue
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from .env import Env, legal_id_lookup
+from .game import HoldemGameState, legal_action_lookup
+from ..models.agent import Agent
+from ..utils.random import create_seed, hash_seed, split_int
+
+
+def episode_dtype(num_players: int, max_steps: int) -> np.dtype:
+    # One finished hand. Decisions are stored in the order they were taken,
+    # followed by the final state of every player.
+    return np.dtype(
+        [
+            ("index", np.int64),
+            ("starter", np.int8),
+            ("num_steps", np.int16),
+            ("players", np.int8, (max_steps,)),
+            ("actions", np.int8, (max_steps,)),
+            ("legal_masks", np.uint8, (max_steps + num_players,)),
+            ("obs", np.uint8, (max_steps + num_players, 72)),
+            ("payoffs", np.float64, (num_players,)),
+        ]
+    )
+
+
+def max_episode_steps(num_players: int, allowed_raise: int) -> int:
+    # Every round closes after at most allowed_raise raises, each answered
+    # by everyone else, plus one extra action per player that folds.
+    return 4 * (allowed_raise + 1) * num_players + num_players
+
+
+def seed_episode(env: Env, seed: int, index: int) -> None:
+    # Episodes draw from their own stream, keyed by the runner seed and the
+    # episode index, whichever worker plays them. Agents act on np.random
+    # and random; torch is left alone, reseeding it costs more than a hand.
+    episode_seed: int = create_seed("{}:{}".format(seed, index))
+    env.game.seed(split_int(hash_seed(episode_seed)))
+    np.random.seed(episode_seed % 2**32)
+    random.seed(episode_seed)
+
+
+class Episode:
+    def __init__(self, record: np.void) -> None:
+        num_steps: int = int(record["num_steps"])
+        max_steps: int = len(record["players"])
+
+        self.index: int = int(record["index"])
+        self.starter: int = int(record["starter"])
+        self.players: np.ndarray = record["players"][:num_steps].copy()
+        self.actions: np.ndarray = record["actions"][:num_steps].copy()
+        self.legal_masks: np.ndarray = record["legal_masks"][:num_steps].copy()
+        self.obs: np.ndarray = record["obs"][:num_steps].copy()
+        self.final_legal_masks: np.ndarray = record["legal_masks"][
+            max_steps:
+        ].copy()
+        self.final_obs: np.ndarray = record["obs"][max_steps:].copy()
+        self.payoffs: List[float] = record["payoffs"].tolist()
+
+    @property
+    def num_players(self) -> int:
+        return len(self.payoffs)
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    @staticmethod
+    def __state(obs: np.ndarray, legal_mask: int) -> HoldemGameState:
+        # float32 like the observations Env hands out by default
+        return {
+            "obs": obs.astype(np.float32),
+            "legal_actions": OrderedDict.fromkeys(legal_id_lookup[legal_mask]),
+            "raw_legal_actions": list(legal_action_lookup[legal_mask]),
+        }
+
+    def trajectories(self) -> List[List[HoldemGameState | int]]:
+        # The trajectories Env.run returns, with states reduced to the keys
+        # agents learn from.
+        result: List[List[HoldemGameState | int]] = [
+            [] for _ in range(self.num_players)
+        ]
+        for step in range(len(self)):
+            player: int = int(self.players[step])
+            result[player].append(
+                self.__state(self.obs[step], int(self.legal_masks[step]))
+            )
+            result[player].append(int(self.actions[step]))
+        for player in range(self.num_players):
+            result[player].append(
+                self.__state(
+                    self.final_obs[player], int(self.final_legal_masks[player])
+                )
+            )
+        return result
+
+
+def play_episode(env: Env, record: np.void, is_training: bool) -> None:
+    max_steps: int = len(record["players"])
+
+    state: HoldemGameState
+    player_id: int
+    state, player_id = env.reset()
+    record["starter"] = player_id
+
+    step: int = 0
+    while not env.is_over():
+        assert step < max_steps
+        env.observe(player_id, record["obs"][step])
+        record["legal_masks"][step] = state.legal_mask
+        record["players"][step] = player_id
+
+        action: int
+        if not is_training:
+            action, _ = env.agents[player_id].eval_step(state)
+        else:
+            action = env.agents[player_id].step(state)
+        record["actions"][step] = action
+
+        state, player_id = env.step(action)
+        step += 1
+
+    for player in range(env.num_players):
+        env.observe(player, record["obs"][max_steps + player])
+        record["legal_masks"][max_steps + player] = env.legal_mask()
+    record["payoffs"] = env.game.payoffs()
+    record["num_steps"] = step
+
+
+def run_worker(
+    worker_id: int,
+    payload: bytes,
+    config: Dict[str, int | bool],
+    memory_name: str,
+    tasks: Queue,
+    updates: Queue,
+    free_slots: Queue,
+    results: Queue,
+) -> None:
+    memory: SharedMemory = SharedMemory(name=memory_name)
+    slots: np.ndarray = np.ndarray(
+        (config["num_workers"], config["num_slots"]),
+        dtype=episode_dtype(config["num_players"], config["max_steps"]),
+        buffer=memory.buf,
+    )[worker_id]
+    try:
+        env: Env = Env(pickle.loads(payload), config["num_players"])
+
+        available: List[int] = list(range(config["num_slots"]))
+        while True:
+            task: Tuple[int, int] | None = tasks.get()
+            if task is None:
+                break
+
+            # agents sent by set_agents replace the local copies between
+            # batches of episodes
+            try:
+                while True:
+                    env.agents = pickle.loads(updates.get_nowait())
+            except queue.Empty:
+                pass
+
+            for index in range(*task):
+                if not available:
+                    available.append(free_slots.get())
+                slot: int = available.pop()
+
+                seed_episode(env, config["seed"], index)
+                slots[slot]["index"] = index
+                play_episode(env, slots[slot], config["is_training"])
+                results.put((worker_id, slot, index))
+    except Exception:
+        results.put((worker_id, None, traceback.format_exc()))
+    finally:
+        del slots
+        memory.close()
+
+
+class ParallelEnvRunner:
+    def __init__(
+        self,
+        agents: List[Agent],
+        num_workers: int | None = None,
+        num_players: int = 2,
+        seed: int = 3407,
+        is_training: bool = False,
+        deterministic: bool = False,
+        num_slots: int = 4,
+        chunk_size: int = 8,
+    ) -> None:
+        self.num_workers: int = num_workers or os.cpu_count() or 1
+        self.num_players: int = num_players
+        self.seed: int = seed
+        self.deterministic: bool = deterministic
+        self.chunk_size: int = chunk_size
+        self.next_index: int = 0
+        self.failed: bool = False
+
+        # Every worker owns num_slots episode records in one shared block.
+        # A worker fills a free slot and reports it, and the slot is handed
+        # back once the learner side has copied the episode out. Records
+        # are sized for the game the workers build, which this env mirrors.
+        env: Env = Env(agents, num_players)
+        config: Dict[str, int | bool] = {
+            "num_workers": self.num_workers,
+            "num_slots": num_slots,
+            "num_players": num_players,
+            "max_steps": max_episode_steps(
+                num_players, env.game.allowed_raise
+            ),
+            "seed": seed,
+            "is_training": is_training,
+        }
+        dtype: np.dtype = episode_dtype(num_players, config["max_steps"])
+        self.memory: SharedMemory = SharedMemory(
+            create=True, size=self.num_workers * num_slots * dtype.itemsize
+        )
+        self.slots: np.ndarray = np.ndarray(
+            (self.num_workers, num_slots), dtype=dtype, buffer=self.memory.buf
+        )
+
+        self.tasks: Queue = Queue()
+        self.results: Queue = Queue()
+        self.updates: List[Queue] = [Queue() for _ in range(self.num_workers)]
+        self.free_slots: List[Queue] = [
+            Queue() for _ in range(self.num_workers)
+        ]
+
+        payload: bytes = pickle.dumps(agents)
+        self.workers: List[Process] = [
+            Process(
+                target=run_worker,
+                args=(
+                    worker_id,
+                    payload,
+                    config,
+                    self.memory.name,
+                    self.tasks,
+                    self.updates[worker_id],
+                    self.free_slots[worker_id],
+                    self.results,
+                ),
+                daemon=True,
+            )
+            for worker_id in range(self.num_workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def __enter__(self) -> "ParallelEnvRunner":
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        self.close()
+
+    def set_agents(self, agents: List[Agent]) -> None:
+        # picked up by every worker before its next batch of episodes
+        payload: bytes = pickle.dumps(agents)
+        for updates in self.updates:
+            updates.put(payload)
+
+    def run(self, num_episodes: int) -> Iterator[Episode]:
+        # Episodes come in arrival order, or by index when deterministic.
+        # Either way an episode only depends on the seed and its index.
+        start: int = self.next_index
+        self.next_index += num_episodes
+        for index in range(start, self.next_index, self.chunk_size):
+            self.tasks.put(
+                (index, min(index + self.chunk_size, self.next_index))
+            )
+
+        pending: Dict[int, Episode] = {}
+        expected: int = start
+        received: int = 0
+        try:
+            while received < num_episodes:
+                episode: Episode = self.__receive()
+                received += 1
+                if not self.deterministic:
+                    yield episode
+                    continue
+
+                pending[episode.index] = episode
+                while expected in pending:
+                    yield pending.pop(expected)
+                    expected += 1
+        finally:
+            # an abandoned run still has to hand its slots back
+            while received < num_episodes and not self.failed:
+                self.__receive()
+                received += 1
+
+    def __receive(self) -> Episode:
+        worker_id: int
+        slot: int | None
+        worker_id, slot, message = self.results.get()
+        if slot is None:
+            self.failed = True
+            raise RuntimeError(
+                "worker {} failed:\n{}".format(worker_id, message)
+            )
+
+        episode: Episode = Episode(self.slots[worker_id, slot])
+        self.free_slots[worker_id].put(slot)
+        return episode
+
+    def close(self) -> None:
+        for _ in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            # after a failure the others may wait on slots nobody frees
+            if self.failed:
+                worker.terminate()
+            worker.join()
+
+        del self.slots
+        self.memory.close()
+        self.memory.unlink()
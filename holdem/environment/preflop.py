@@ -0,0 +1,92 @@
+import argparse
+import os
+from typing import List, Sequence
+import numpy as np
+
+from .equity import remaining_cards
+from .evaluator import card_rank_lookup, card_suit_lookup, num_ranks
+from .hand import evaluate_batch
+from ..utils.random import create_random_generator
+
+# Starting hands are indexed on a 13x13 grid of ranks (0 is a deuce): pairs
+# sit on the diagonal, suited hands at [high, low] and offsuit hands at
+# [low, high], which covers the 169 strategically distinct hands.
+num_starting_hands: int = num_ranks * num_ranks
+
+preflop_dtype: np.dtype = np.dtype(
+    [("equity", "<f4"), ("categories", "<f4", (10,))]
+)
+
+default_preflop_path: str = os.path.join(
+    os.path.dirname(__file__), "data", "preflop.bin"
+)
+
+
+def starting_hand_index(first: int, second: int) -> int:
+    high: int = max(card_rank_lookup[first], card_rank_lookup[second])
+    low: int = min(card_rank_lookup[first], card_rank_lookup[second])
+    if card_suit_lookup[first] == card_suit_lookup[second]:
+        return high * num_ranks + low
+    return low * num_ranks + high
+
+
+def starting_hand_cards(index: int) -> List[int]:
+    row, column = divmod(index, num_ranks)
+    second_suit: int = 0 if row > column else 1
+    # ranks count from the deuce, card ids from the ace of every suit
+    return [
+        (row + 1) % num_ranks,
+        second_suit * num_ranks + (column + 1) % num_ranks,
+    ]
+
+
+def generate_preflop_table(samples: int, seed: int = 3407) -> np.ndarray:
+    random, _ = create_random_generator(seed)
+
+    table: np.ndarray = np.zeros(num_starting_hands, dtype=preflop_dtype)
+    for index in range(num_starting_hands):
+        hole: List[int] = starting_hand_cards(index)
+        remaining: np.ndarray = np.array(remaining_cards(hole))
+
+        # two opponent cards followed by the five board cards
+        draws: np.ndarray = remaining[
+            random.rand(samples, len(remaining)).argpartition(7, axis=1)[:, :7]
+        ]
+        board: np.ndarray = draws[:, 2:]
+        categories, ours = evaluate_batch(
+            np.hstack([np.broadcast_to(hole, (samples, 2)), board])
+        )
+        _, theirs = evaluate_batch(np.hstack([draws[:, :2], board]))
+
+        table[index]["equity"] = np.mean(ours > theirs) + 0.5 * np.mean(
+            ours == theirs
+        )
+        table[index]["categories"] = (
+            np.bincount(categories, minlength=10) / samples
+        )
+
+    return table
+
+
+class PreflopTable:
+    def __init__(self, path: str = default_preflop_path) -> None:
+        self.table: np.memmap = np.memmap(
+            path, dtype=preflop_dtype, mode="r", shape=(num_starting_hands,)
+        )
+
+    def equity(self, hole: Sequence[int]) -> float:
+        return float(self.table["equity"][starting_hand_index(*hole)])
+
+    def categories(self, hole: Sequence[int]) -> np.ndarray:
+        return self.table["categories"][starting_hand_index(*hole)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=3407)
+    parser.add_argument("--output", type=str, default=default_preflop_path)
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    generate_preflop_table(args.samples, args.seed).tofile(args.output)
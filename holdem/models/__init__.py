@@ -3,3 +3,4 @@ from .random import RandomAgent
 from .dqn import DQNAgent
 from .rule_based import RuleBasedAgent
 from .q_learning import QLearningAgent
+from .inference import Histogram, InferenceClient, InferenceServer
@@ -1,5 +1,33 @@
-from typing import Tuple
+from collections import OrderedDict
+from typing import List, Tuple
 from abc import ABC
+import numpy as np
+
+
+def batch_states(obs: np.ndarray, legal_masks: np.ndarray) -> List[dict]:
+    # The state dicts step and eval_step expect, one per row of a batch.
+    # legal_masks is a (batch, num_actions) bool array.
+    from ..environment.game import action_lookup
+
+    states: List[dict] = []
+    for i in range(len(obs)):
+        legal_actions: List[int] = np.flatnonzero(legal_masks[i]).tolist()
+        states.append(
+            {
+                "obs": obs[i],
+                "legal_actions": OrderedDict.fromkeys(legal_actions),
+                "raw_legal_actions": [action_lookup[a] for a in legal_actions],
+            }
+        )
+    return states
+
+
+def sample_legal(legal_masks: np.ndarray) -> np.ndarray:
+    # a uniformly drawn legal action for every row
+    keys: np.ndarray = np.where(
+        legal_masks, np.random.rand(*legal_masks.shape), -1
+    )
+    return keys.argmax(axis=1)
 
 
 class Agent(ABC):
@@ -11,3 +39,24 @@ class Agent(ABC):
 
     def eval_step(self, state: dict) -> Tuple[int, dict]:
         raise NotImplementedError
+
+    def batch_step(
+        self, obs: np.ndarray, legal_masks: np.ndarray
+    ) -> np.ndarray:
+        # step over stacked observations and (batch, num_actions) legal
+        # masks; agents override it with a vectorized version
+        return np.array(
+            [self.step(state) for state in batch_states(obs, legal_masks)],
+            dtype=np.int64,
+        )
+
+    def batch_eval_step(
+        self, obs: np.ndarray, legal_masks: np.ndarray
+    ) -> np.ndarray:
+        return np.array(
+            [
+                self.eval_step(state)[0]
+                for state in batch_states(obs, legal_masks)
+            ],
+            dtype=np.int64,
+        )
@@ -25,6 +25,7 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import json
 import os
 import random
 import numpy as np
@@ -32,7 +33,7 @@ import torch
 import torch.nn as nn
 from collections import namedtuple
 from copy import deepcopy
-from .agent import Agent
+from .agent import Agent, sample_legal
 
 Transition = namedtuple(
     "Transition",
@@ -64,6 +65,11 @@ class DQNAgent(Agent):
         device=None,
         save_path=None,
         save_every=float("inf"),
+        prioritized_replay=False,
+        priority_alpha=0.6,
+        priority_beta_start=0.4,
+        priority_beta_steps=100000,
+        replay_memory_dir=None,
     ):
         """
         Q-Learning algorithm for off-policy TD control using Function Approximation.
@@ -90,6 +96,16 @@ class DQNAgent(Agent):
             device (torch.device): whether to use the cpu or gpu
             save_path (str): The path to save the model checkpoints
             save_every (int): Save the model every X training steps
+            prioritized_replay (bool): Sample transitions in proportion to their
+              TD errors instead of uniformly
+            priority_alpha (float): How much the TD errors shape the sampling,
+              0 is uniform
+            priority_beta_start (float): The initial exponent of the importance
+              sampling weights, annealed to 1
+            priority_beta_steps (int): Number of training steps to anneal the
+              importance sampling exponent over
+            replay_memory_dir (str): Keep the replay memory in memory-mapped files
+              under this directory, resuming from the files found there
         """
         self.replay_memory_init_size = replay_memory_init_size
         self.update_target_estimator_every = update_target_estimator_every
@@ -135,12 +151,47 @@ class DQNAgent(Agent):
         )
 
         # Create replay memory
-        self.memory = Memory(replay_memory_size, batch_size)
+        self.prioritized_replay = prioritized_replay
+        self.priority_betas = np.linspace(
+            priority_beta_start, 1.0, priority_beta_steps
+        )
+        self.replay_memory_dir = replay_memory_dir
+        if prioritized_replay and replay_memory_dir is not None:
+            raise ValueError(
+                "prioritized replay needs the replay memory in RAM"
+            )
+        if replay_memory_dir is not None:
+            self.memory = MappedMemory(
+                replay_memory_size,
+                batch_size,
+                state_shape,
+                num_actions,
+                directory=replay_memory_dir,
+            )
+        elif prioritized_replay:
+            self.memory = PrioritizedMemory(
+                replay_memory_size,
+                batch_size,
+                state_shape,
+                num_actions,
+                alpha=priority_alpha,
+            )
+        else:
+            self.memory = Memory(
+                replay_memory_size, batch_size, state_shape, num_actions
+            )
 
         # Checkpoint saving parameters
         self.save_path = save_path
         self.save_every = save_every
 
+    def __getstate__(self):
+        # Pickled copies go to evaluation and rollout workers, which only
+        # act, so the replay memory stays behind. save_checkpoint keeps it.
+        state = self.__dict__.copy()
+        state["memory"] = None
+        return state
+
     def feed(self, ts):
         """Store data in to replay buffer and train the agent. There are two stages.
             In stage 1, populate the memory without training
@@ -150,7 +201,7 @@ class DQNAgent(Agent):
             ts (list): a list of 5 elements that represent the transition
         """
         (state, action, reward, next_state, done) = tuple(ts)
-        self.feed_memory(
+        self.feed_transition(
             state["obs"],
             action,
             reward,
@@ -158,6 +209,23 @@ class DQNAgent(Agent):
             list(next_state["legal_actions"].keys()),
             done,
         )
+
+    def feed_transition(
+        self, state, action, reward, next_state, legal_actions, done
+    ):
+        """Store one transition given as arrays and train the agent, see feed
+
+        Args:
+            state (numpy.array): the current state
+            action (int): the performed action ID
+            reward (float): the reward received
+            next_state (numpy.array): the next state after performing the action
+            legal_actions (list): the legal actions of the next state
+            done (boolean): whether the episode is finished
+        """
+        self.feed_memory(
+            state, action, reward, next_state, legal_actions, done
+        )
         self.total_t += 1
         tmp = self.total_t - self.replay_memory_init_size
         if tmp >= 0 and tmp % self.train_every == 0:
@@ -212,6 +280,54 @@ class DQNAgent(Agent):
 
         return best_action, info
 
+    def batch_step(self, obs, legal_masks):
+        """Epsilon-greedy actions for a batch of states, see step
+
+        Args:
+            obs (numpy.array): stacked states, one row per state
+            legal_masks (numpy.array): a boolean array of shape
+              (batch, num_actions) marking the legal actions of every state
+
+        Returns:
+            actions (numpy.array): an action id for every state
+        """
+        legal_masks = np.asarray(legal_masks, dtype=bool)
+        q_values = self.batch_predict(obs, legal_masks)
+        epsilon = self.epsilons[
+            min(self.total_t, self.epsilon_decay_steps - 1)
+        ]
+        explore = np.random.rand(len(legal_masks)) < epsilon
+        return np.where(
+            explore, sample_legal(legal_masks), np.argmax(q_values, axis=1)
+        )
+
+    def batch_eval_step(self, obs, legal_masks):
+        """Greedy actions for a batch of states, see eval_step
+
+        Args:
+            obs (numpy.array): stacked states, one row per state
+            legal_masks (numpy.array): a boolean array of shape
+              (batch, num_actions) marking the legal actions of every state
+
+        Returns:
+            actions (numpy.array): an action id for every state
+        """
+        return np.argmax(self.batch_predict(obs, legal_masks), axis=1)
+
+    def batch_predict(self, obs, legal_masks):
+        """Predict the masked Q-values of a batch of states in one pass
+
+        Args:
+            obs (numpy.array): stacked states, one row per state
+            legal_masks (numpy.array): a boolean array of shape
+              (batch, num_actions) marking the legal actions of every state
+
+        Returns:
+            q_values (numpy.array): a 2-d array of Q values, -inf where illegal
+        """
+        q_values = self.q_estimator.predict_nograd(np.asarray(obs))
+        return np.where(legal_masks, q_values, -np.inf)
+
     def predict(self, state):
         """Predict the masked Q-values
 
@@ -237,29 +353,34 @@ class DQNAgent(Agent):
         Returns:
             loss (float): The loss of the current batch.
         """
-        (
-            state_batch,
-            action_batch,
-            reward_batch,
-            next_state_batch,
-            done_batch,
-            legal_actions_batch,
-        ) = self.memory.sample()
+        weight_batch = None
+        if self.prioritized_replay:
+            beta = self.priority_betas[
+                min(self.train_t, len(self.priority_betas) - 1)
+            ]
+            (
+                state_batch,
+                action_batch,
+                reward_batch,
+                next_state_batch,
+                done_batch,
+                legal_mask_batch,
+                index_batch,
+                weight_batch,
+            ) = self.memory.sample(beta)
+        else:
+            (
+                state_batch,
+                action_batch,
+                reward_batch,
+                next_state_batch,
+                done_batch,
+                legal_mask_batch,
+            ) = self.memory.sample()
 
         # Calculate best next actions using Q-network (Double DQN)
         q_values_next = self.q_estimator.predict_nograd(next_state_batch)
-        legal_actions = []
-        for b in range(self.batch_size):
-            legal_actions.extend(
-                [i + b * self.num_actions for i in legal_actions_batch[b]]
-            )
-        masked_q_values = -np.inf * np.ones(
-            self.num_actions * self.batch_size, dtype=float
-        )
-        masked_q_values[legal_actions] = q_values_next.flatten()[legal_actions]
-        masked_q_values = masked_q_values.reshape(
-            (self.batch_size, self.num_actions)
-        )
+        masked_q_values = np.where(legal_mask_batch, q_values_next, -np.inf)
         best_actions = np.argmax(masked_q_values, axis=1)
 
         # Evaluate best next actions using Target-network (Double DQN)
@@ -274,9 +395,13 @@ class DQNAgent(Agent):
         )
 
         # Perform gradient descent update
-        state_batch = np.array(state_batch)
-
-        loss = self.q_estimator.update(state_batch, action_batch, target_batch)
+        loss = self.q_estimator.update(
+            state_batch, action_batch, target_batch, weight_batch
+        )
+        if self.prioritized_replay:
+            self.memory.update_priorities(
+                index_batch, self.q_estimator.td_errors
+            )
         print(
             "\rINFO - Step {}, rl-loss: {}".format(self.total_t, loss), end=""
         )
@@ -338,6 +463,9 @@ class DQNAgent(Agent):
             "num_actions": self.num_actions,
             "train_every": self.train_every,
             "device": self.device,
+            "prioritized_replay": self.prioritized_replay,
+            "priority_beta_start": self.priority_betas[0],
+            "priority_beta_steps": len(self.priority_betas),
         }
 
     @classmethod
@@ -350,6 +478,10 @@ class DQNAgent(Agent):
         """
 
         print("\nINFO - Restoring model from checkpoint...")
+        # the constructor would start an empty memory where files are gone
+        memory = checkpoint["memory"]
+        if memory.get("directory") is not None and memory.get("size", 0) > 0:
+            MappedMemory.require_files(memory["directory"])
         agent_instance = cls(
             replay_memory_size=checkpoint["memory"]["memory_size"],
             update_target_estimator_every=checkpoint[
@@ -365,6 +497,10 @@ class DQNAgent(Agent):
             state_shape=checkpoint["q_estimator"]["state_shape"],
             mlp_layers=checkpoint["q_estimator"]["mlp_layers"],
             train_every=checkpoint["train_every"],
+            prioritized_replay=checkpoint.get("prioritized_replay", False),
+            priority_beta_start=checkpoint.get("priority_beta_start", 0.4),
+            priority_beta_steps=checkpoint.get("priority_beta_steps", 100000),
+            replay_memory_dir=checkpoint["memory"].get("directory"),
         )
 
         agent_instance.total_t = checkpoint["total_t"]
@@ -374,7 +510,16 @@ class DQNAgent(Agent):
             checkpoint["q_estimator"]
         )
         agent_instance.target_estimator = deepcopy(agent_instance.q_estimator)
-        agent_instance.memory = Memory.from_checkpoint(checkpoint["memory"])
+        # a memory-mapped memory was already reopened from its files
+        if agent_instance.replay_memory_dir is None:
+            memory_class = (
+                PrioritizedMemory
+                if agent_instance.prioritized_replay
+                else Memory
+            )
+            agent_instance.memory = memory_class.from_checkpoint(
+                checkpoint["memory"], checkpoint["num_actions"]
+            )
 
         return agent_instance
 
@@ -436,6 +581,7 @@ class Estimator(object):
 
         # set up loss function
         self.mse_loss = nn.MSELoss(reduction="mean")
+        self.td_errors = None
 
         # set up optimizer
         self.optimizer = torch.optim.Adam(
@@ -459,16 +605,19 @@ class Estimator(object):
             q_as = self.qnet(s).cpu().numpy()
         return q_as
 
-    def update(self, s, a, y):
+    def update(self, s, a, y, w=None):
         """Updates the estimator towards the given targets.
             In this case y is the target-network estimated
             value of the Q-network optimal actions, which
             is labeled y in Algorithm 1 of Minh et al. (2015)
+            The TD errors of the batch are kept in td_errors.
 
         Args:
           s (np.ndarray): (batch, state_shape) state representation
           a (np.ndarray): (batch,) integer sampled actions
           y (np.ndarray): (batch,) value of optimal actions according to Q-target
+          w (np.ndarray): (batch,) importance sampling weights, or None to
+            weigh every sample the same
 
         Returns:
           The calculated loss on the batch.
@@ -488,7 +637,12 @@ class Estimator(object):
         Q = torch.gather(q_as, dim=-1, index=a.unsqueeze(-1)).squeeze(-1)
 
         # update model
-        batch_loss = self.mse_loss(Q, y)
+        if w is None:
+            batch_loss = self.mse_loss(Q, y)
+        else:
+            w = torch.from_numpy(w).float().to(self.device)
+            batch_loss = torch.mean(w * (Q - y) ** 2)
+        self.td_errors = (Q - y).detach().cpu().numpy()
         batch_loss.backward()
         self.optimizer.step()
         batch_loss = batch_loss.item()
@@ -564,16 +718,78 @@ class EstimatorNetwork(nn.Module):
 
 
 class Memory(object):
-    """Memory for saving transitions"""
+    """Memory for saving transitions
 
-    def __init__(self, memory_size, batch_size):
+    Transitions live in preallocated arrays used as a ring buffer, so saving
+    overwrites the oldest transition once the memory is full and sampling
+    gathers contiguous batches by fancy indexing.
+    """
+
+    def __init__(
+        self,
+        memory_size,
+        batch_size,
+        state_shape=None,
+        num_actions=2,
+        state_dtype=np.float32,
+    ):
         """Initialize
         Args:
             memory_size (int): the size of the memroy buffer
+            batch_size (int): the number of transitions in a sampled batch
+            state_shape (list): the shape of a state, taken from the first
+              saved state when None
+            num_actions (int): the number of actions
+            state_dtype (numpy.dtype): the dtype states are stored with
         """
         self.memory_size = memory_size
         self.batch_size = batch_size
-        self.memory = []
+        self.num_actions = num_actions
+        self.state_dtype = np.dtype(state_dtype)
+        self.size = 0
+        self.position = 0
+
+        self.states = None
+        self.actions = None
+        self.rewards = None
+        self.next_states = None
+        self.dones = None
+        self.legal_masks = None
+        if state_shape is not None:
+            self.allocate(state_shape)
+
+    def allocate(self, state_shape):
+        """Allocate the arrays of every column
+
+        Args:
+            state_shape (list): the shape of a state
+        """
+        size = self.memory_size
+        shape = (size,) + tuple(state_shape)
+        self.states = self.column("states", shape, self.state_dtype)
+        self.actions = self.column("actions", (size,), np.int64)
+        self.rewards = self.column("rewards", (size,), np.float32)
+        self.next_states = self.column("next_states", shape, self.state_dtype)
+        self.dones = self.column("dones", (size,), bool)
+        self.legal_masks = self.column(
+            "legal_masks", (size, self.num_actions), bool
+        )
+
+    def column(self, name, shape, dtype):
+        """Create the array of a column
+
+        Args:
+            name (str): the name of the column
+            shape (tuple): the shape of the array
+            dtype (numpy.dtype): the dtype of the array
+
+        Returns:
+            array (numpy.array): a zeroed array
+        """
+        return np.zeros(shape, dtype=dtype)
+
+    def __len__(self):
+        return self.size
 
     def save(self, state, action, reward, next_state, legal_actions, done):
         """Save transition into memory
@@ -586,26 +802,48 @@ class Memory(object):
             legal_actions (list): the legal actions of the next state
             done (boolean): whether the episode is finished
         """
-        if len(self.memory) == self.memory_size:
-            self.memory.pop(0)
-        transition = Transition(
-            state, action, reward, next_state, done, legal_actions
-        )
-        self.memory.append(transition)
+        if self.states is None:
+            self.allocate(np.shape(state))
+
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.legal_masks[i] = False
+        self.legal_masks[i, legal_actions] = True
+
+        self.position = (i + 1) % self.memory_size
+        self.size = min(self.size + 1, self.memory_size)
 
     def sample(self):
         """Sample a minibatch from the replay memory
 
         Returns:
-            state_batch (list): a batch of states
-            action_batch (list): a batch of actions
-            reward_batch (list): a batch of rewards
-            next_state_batch (list): a batch of states
-            done_batch (list): a batch of dones
+            state_batch (numpy.array): a batch of states
+            action_batch (numpy.array): a batch of actions
+            reward_batch (numpy.array): a batch of rewards
+            next_state_batch (numpy.array): a batch of states
+            done_batch (numpy.array): a batch of dones
+            legal_mask_batch (numpy.array): a boolean array of shape
+              (batch, num_actions) marking the legal actions of next states
         """
-        samples = random.sample(self.memory, self.batch_size)
-        samples = tuple(zip(*samples))
-        return tuple(map(np.array, samples[:-1])) + (samples[-1],)
+        # offsets from the oldest transition, drawn without replacement
+        offsets = random.sample(range(self.size), self.batch_size)
+        indices = (np.array(offsets) + self.oldest()) % self.memory_size
+        return (
+            self.states[indices],
+            self.actions[indices],
+            self.rewards[indices],
+            self.next_states[indices],
+            self.dones[indices],
+            self.legal_masks[indices],
+        )
+
+    def oldest(self):
+        """Return the index of the oldest transition"""
+        return (self.position - self.size) % self.memory_size
 
     def checkpoint_attributes(self):
         """Returns the attributes that need to be checkpointed"""
@@ -613,21 +851,499 @@ class Memory(object):
         return {
             "memory_size": self.memory_size,
             "batch_size": self.batch_size,
-            "memory": self.memory,
+            "num_actions": self.num_actions,
+            "state_dtype": self.state_dtype.str,
+            "size": self.size,
+            "position": self.position,
+            "states": self.states,
+            "actions": self.actions,
+            "rewards": self.rewards,
+            "next_states": self.next_states,
+            "dones": self.dones,
+            "legal_masks": self.legal_masks,
         }
 
     @classmethod
-    def from_checkpoint(cls, checkpoint):
+    def from_checkpoint(cls, checkpoint, num_actions=2):
         """
         Restores the attributes from the checkpoint
 
         Args:
             checkpoint (dict): the checkpoint dictionary
+            num_actions (int): the number of actions, for checkpoints that
+              do not record it
 
         Returns:
             instance (Memory): the restored instance
         """
 
-        instance = cls(checkpoint["memory_size"], checkpoint["batch_size"])
-        instance.memory = checkpoint["memory"]
+        if "memory" in checkpoint:
+            # checkpoints written before the ring buffer hold a list of
+            # transitions, oldest first
+            instance = cls(
+                checkpoint["memory_size"],
+                checkpoint["batch_size"],
+                num_actions=num_actions,
+            )
+            for t in checkpoint["memory"]:
+                instance.save(
+                    t.state,
+                    t.action,
+                    t.reward,
+                    t.next_state,
+                    t.legal_actions,
+                    t.done,
+                )
+            return instance
+
+        instance = cls(
+            checkpoint["memory_size"],
+            checkpoint["batch_size"],
+            num_actions=checkpoint["num_actions"],
+            state_dtype=checkpoint.get("state_dtype", np.float32),
+        )
+        instance.size = checkpoint["size"]
+        instance.position = checkpoint["position"]
+        for key in (
+            "states",
+            "actions",
+            "rewards",
+            "next_states",
+            "dones",
+            "legal_masks",
+        ):
+            setattr(instance, key, checkpoint[key])
         return instance
+
+
+class SumTree(object):
+    """Binary tree of priorities stored in a flat array
+
+    Leaves hold the priorities and every other node the sum of its two
+    children, with the root at index 1, so updating a priority and drawing
+    an index in proportion to its priority both walk a single path. A
+    second tree laid out the same way keeps minimums instead of sums, of
+    the positive priorities only, as empty slots have priority 0.
+    """
+
+    def __init__(self, capacity):
+        """Initialize
+
+        Args:
+            capacity (int): the number of priorities
+        """
+        self.capacity = capacity
+        # leaves start at a power of two, so every path has the same length
+        self.leaf_start = 1
+        while self.leaf_start < capacity:
+            self.leaf_start *= 2
+        self.nodes = np.zeros(2 * self.leaf_start, dtype=np.float64)
+        self.mins = np.full(2 * self.leaf_start, np.inf)
+
+    @property
+    def total(self):
+        """Return the sum of all priorities"""
+        return self.nodes[1]
+
+    @property
+    def min(self):
+        """Return the smallest positive priority, inf when there is none"""
+        return self.mins[1]
+
+    @property
+    def leaves(self):
+        """Return a view of all priorities"""
+        return self.nodes[self.leaf_start : self.leaf_start + self.capacity]
+
+    def get(self, indices):
+        """Return the priorities at indices"""
+        return self.nodes[self.leaf_start + np.asarray(indices)]
+
+    def update(self, indices, priorities):
+        """Set the priorities at indices and refresh their ancestors
+
+        Args:
+            indices (numpy.array): the indices to update
+            priorities (numpy.array): the new priorities
+        """
+        nodes = self.leaf_start + np.asarray(indices)
+        self.nodes[nodes] = priorities
+        self.mins[nodes] = np.where(
+            np.asarray(priorities) > 0, priorities, np.inf
+        )
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self.nodes[nodes] = (
+                self.nodes[2 * nodes] + self.nodes[2 * nodes + 1]
+            )
+            self.mins[nodes] = np.minimum(
+                self.mins[2 * nodes], self.mins[2 * nodes + 1]
+            )
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        """Find the leaves where the running sum of priorities reaches values
+
+        Args:
+            values (numpy.array): numbers in [0, total)
+
+        Returns:
+            indices (numpy.array): the index of a leaf for every value
+        """
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        while nodes[0] < self.leaf_start:
+            left = 2 * nodes
+            go_right = values >= self.nodes[left]
+            values -= np.where(go_right, self.nodes[left], 0.0)
+            nodes = left + go_right
+        # rounding can step onto an empty leaf past the last priority
+        return np.minimum(nodes - self.leaf_start, self.capacity - 1)
+
+
+class PrioritizedMemory(Memory):
+    """Memory sampling transitions in proportion to their priorities
+
+    Proportional prioritized replay of Schaul et al. (2016): a transition is
+    drawn with probability p^alpha / sum(p^alpha), where p is its latest
+    absolute TD error, and new transitions get the highest priority seen.
+    """
+
+    def __init__(
+        self,
+        memory_size,
+        batch_size,
+        state_shape=None,
+        num_actions=2,
+        state_dtype=np.float32,
+        alpha=0.6,
+        epsilon=1e-6,
+    ):
+        """Initialize
+        Args:
+            memory_size (int): the size of the memroy buffer
+            batch_size (int): the number of transitions in a sampled batch
+            state_shape (list): the shape of a state, taken from the first
+              saved state when None
+            num_actions (int): the number of actions
+            state_dtype (numpy.dtype): the dtype states are stored with
+            alpha (float): how much the priorities shape the sampling
+            epsilon (float): added to TD errors so no transition starves
+        """
+        super().__init__(
+            memory_size, batch_size, state_shape, num_actions, state_dtype
+        )
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.max_priority = 1.0
+        self.tree = SumTree(memory_size)
+
+    def save(self, state, action, reward, next_state, legal_actions, done):
+        """Save transition into memory with the highest priority, see
+        Memory.save
+        """
+        index = self.position
+        super().save(state, action, reward, next_state, legal_actions, done)
+        self.tree.update([index], self.max_priority**self.alpha)
+
+    def sample(self, beta=0.4):
+        """Sample a minibatch in proportion to the priorities
+
+        Args:
+            beta (float): the exponent of the importance sampling weights
+
+        Returns:
+            the batches of Memory.sample, followed by
+            index_batch (numpy.array): the sampled indices, for
+              update_priorities
+            weight_batch (numpy.array): the importance sampling weights,
+              scaled so the largest possible weight is 1
+        """
+        # one draw in each of batch_size equal slices of the total
+        total = self.tree.total
+        bounds = np.arange(self.batch_size) * (total / self.batch_size)
+        values = bounds + np.random.rand(self.batch_size) * (
+            total / self.batch_size
+        )
+        indices = np.minimum(self.tree.find(values), self.size - 1)
+
+        probs = self.tree.get(indices) / total
+        min_prob = self.tree.min / total
+        weights = (probs / min_prob) ** -beta
+
+        return (
+            self.states[indices],
+            self.actions[indices],
+            self.rewards[indices],
+            self.next_states[indices],
+            self.dones[indices],
+            self.legal_masks[indices],
+            indices,
+            weights.astype(np.float32),
+        )
+
+    def update_priorities(self, indices, td_errors):
+        """Set the priorities of sampled transitions from their TD errors
+
+        Args:
+            indices (numpy.array): the indices returned by sample
+            td_errors (numpy.array): the new TD errors of these transitions
+        """
+        priorities = np.abs(td_errors) + self.epsilon
+        self.max_priority = max(self.max_priority, priorities.max())
+        self.tree.update(indices, priorities**self.alpha)
+
+    def checkpoint_attributes(self):
+        """Returns the attributes that need to be checkpointed"""
+
+        attributes = super().checkpoint_attributes()
+        attributes.update(
+            alpha=self.alpha,
+            epsilon=self.epsilon,
+            max_priority=self.max_priority,
+            priorities=self.tree.leaves.copy(),
+        )
+        return attributes
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint, num_actions=2):
+        """
+        Restores the attributes from the checkpoint, see Memory.from_checkpoint
+
+        Transitions of a checkpoint without priorities all start with the
+        highest priority.
+        """
+
+        instance = super().from_checkpoint(checkpoint, num_actions)
+        instance.alpha = checkpoint.get("alpha", instance.alpha)
+        instance.epsilon = checkpoint.get("epsilon", instance.epsilon)
+        if "priorities" in checkpoint:
+            instance.max_priority = checkpoint["max_priority"]
+            instance.tree.update(
+                np.arange(instance.memory_size), checkpoint["priorities"]
+            )
+        elif instance.size > 0:
+            instance.tree.update(
+                np.arange(instance.size), instance.max_priority**instance.alpha
+            )
+        return instance
+
+
+class MappedMemory(Memory):
+    """Memory keeping its columns in memory-mapped files
+
+    Every column is a .npy file under directory, so the memory can outgrow
+    RAM and only the sampled rows are read. The size and write position are
+    kept in a metadata file, written after the columns are flushed.
+
+    Every row also gets a sequence number, the count of transitions saved
+    before it. save sets it to -1 before writing the row and to its number
+    after, so reopening a memory after its process died rolls forward over
+    the rows saved since the last flush and drops a row left half written.
+    This relies on the writes of the process reaching the files in order,
+    which holds when the process crashes but not when the machine does:
+    after a power loss only the rows of the last flush are safe, and a
+    row whose number does not match the metadata raises on open.
+    """
+
+    def __init__(
+        self,
+        memory_size,
+        batch_size,
+        state_shape=None,
+        num_actions=2,
+        state_dtype=np.float32,
+        directory="replay",
+        flush_every=10000,
+    ):
+        """Initialize, resuming from the files found in directory
+
+        Args:
+            memory_size (int): the size of the memroy buffer
+            batch_size (int): the number of transitions in a sampled batch
+            state_shape (list): the shape of a state, taken from the files or
+              the first saved state when None
+            num_actions (int): the number of actions
+            state_dtype (numpy.dtype): the dtype states are stored with
+            directory (str): the directory holding the files
+            flush_every (int): flush the files every X saved transitions
+        """
+        self.directory = directory
+        self.flush_every = flush_every
+        self.unflushed = 0
+        # the number of transitions ever saved
+        self.count = 0
+        self.sequences = None
+        os.makedirs(directory, exist_ok=True)
+
+        meta = None
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            if (
+                meta["memory_size"] != memory_size
+                or meta["num_actions"] != num_actions
+            ):
+                raise ValueError(
+                    "replay memory in {} has size {} and {} actions".format(
+                        directory, meta["memory_size"], meta["num_actions"]
+                    )
+                )
+            state_shape = meta["state_shape"]
+            state_dtype = meta["state_dtype"]
+        self.resumed = meta is not None
+
+        super().__init__(
+            memory_size, batch_size, state_shape, num_actions, state_dtype
+        )
+        if meta is not None:
+            self.size = meta["size"]
+            self.position = meta["position"]
+            self.count = meta["count"]
+            self.recover()
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.directory, "meta.json")
+
+    @staticmethod
+    def require_files(directory):
+        """Raise FileNotFoundError unless directory holds a memory"""
+        if not os.path.exists(os.path.join(directory, "meta.json")):
+            raise FileNotFoundError(
+                "no replay memory files in {}".format(directory)
+            )
+
+    def allocate(self, state_shape):
+        """Open the files of every column, see Memory.allocate"""
+        self.state_shape = list(state_shape)
+        super().allocate(state_shape)
+        self.sequences = self.column(
+            "sequences", (self.memory_size,), np.int64
+        )
+        if not self.resumed:
+            self.sequences[:] = -1
+            self.flush()
+
+    def recover(self):
+        """Roll forward over the rows saved after the last flush
+
+        Raises:
+            ValueError: when a row recorded by the metadata was replaced
+              by something else than a later save
+        """
+        while self.sequences[self.position] == self.count:
+            self.position = (self.position + 1) % self.memory_size
+            self.size = min(self.size + 1, self.memory_size)
+            self.count += 1
+        if self.sequences[self.position] == -1 and self.size > 0:
+            # a save died inside this row, which held the oldest transition
+            # of a full memory or no transition at all
+            self.size = min(self.size, self.memory_size - 1)
+
+        rows = (self.oldest() + np.arange(self.size)) % self.memory_size
+        expected = self.count - self.size + np.arange(self.size)
+        if not np.array_equal(self.sequences[rows], expected):
+            raise ValueError(
+                "replay memory in {} does not match its metadata".format(
+                    self.directory
+                )
+            )
+
+    def column(self, name, shape, dtype):
+        """Open the file of a column, creating it unless resuming"""
+        return np.lib.format.open_memmap(
+            os.path.join(self.directory, name + ".npy"),
+            mode="r+" if self.resumed else "w+",
+            dtype=dtype,
+            shape=shape,
+        )
+
+    def save(self, state, action, reward, next_state, legal_actions, done):
+        """Save transition into memory, see Memory.save"""
+        if self.states is None:
+            self.allocate(np.shape(state))
+
+        i = self.position
+        self.sequences[i] = -1
+        super().save(state, action, reward, next_state, legal_actions, done)
+        self.sequences[i] = self.count
+        self.count += 1
+        self.unflushed += 1
+        if self.unflushed >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Write the columns to disk, then the size and position"""
+        if self.states is None:
+            return
+        for column in (
+            self.states,
+            self.actions,
+            self.rewards,
+            self.next_states,
+            self.dones,
+            self.legal_masks,
+            self.sequences,
+        ):
+            column.flush()
+
+        meta = {
+            "memory_size": self.memory_size,
+            "num_actions": self.num_actions,
+            "state_shape": self.state_shape,
+            "state_dtype": self.state_dtype.str,
+            "size": self.size,
+            "position": self.position,
+            "count": self.count,
+        }
+        # replaced in one step, so a crash leaves the old or the new file
+        path = self.meta_path + ".tmp"
+        with open(path, "w") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path, self.meta_path)
+        self.unflushed = 0
+
+    def __reduce__(self):
+        # pickled agents refer to the files instead of copying them
+        return (self.from_checkpoint, (self.checkpoint_attributes(),))
+
+    def checkpoint_attributes(self):
+        """Returns the attributes that need to be checkpointed
+
+        The transitions stay in the files, which are flushed first.
+        """
+
+        self.flush()
+        return {
+            "memory_size": self.memory_size,
+            "batch_size": self.batch_size,
+            "num_actions": self.num_actions,
+            "state_dtype": self.state_dtype.str,
+            "directory": self.directory,
+            "flush_every": self.flush_every,
+            "size": self.size,
+        }
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint, num_actions=2):
+        """
+        Reopens the files of the checkpoint, see Memory.from_checkpoint
+
+        Raises:
+            FileNotFoundError: when the checkpoint holds transitions but
+              its files are gone
+        """
+
+        if checkpoint.get("size", 0) > 0:
+            cls.require_files(checkpoint["directory"])
+        return cls(
+            checkpoint["memory_size"],
+            checkpoint["batch_size"],
+            num_actions=checkpoint["num_actions"],
+            state_dtype=checkpoint["state_dtype"],
+            directory=checkpoint["directory"],
+            flush_every=checkpoint["flush_every"],
+        )
@@ -0,0 +1,230 @@
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .agent import Agent
+
+
+class Histogram:
+    # Counts of values falling between consecutive edges. Values below the
+    # first edge land in the first bucket and values past the last edge in
+    # the last one.
+    def __init__(self, edges: List[float]) -> None:
+        self.edges: np.ndarray = np.asarray(edges, dtype=float)
+        self.counts: np.ndarray = np.zeros(len(edges) - 1, dtype=np.int64)
+        self.total: float = 0.0
+
+    @classmethod
+    def geometric(
+        cls, low: float, high: float, num_buckets: int
+    ) -> "Histogram":
+        return cls(np.geomspace(low, high, num_buckets + 1).tolist())
+
+    @classmethod
+    def linear(cls, low: int, high: int) -> "Histogram":
+        # one bucket per integer in [low, high]
+        return cls(np.arange(low, high + 2).tolist())
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    @property
+    def mean(self) -> float:
+        return self.total / max(self.count, 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        bucket: int = int(np.searchsorted(self.edges, value, side="right"))
+        self.counts[min(max(bucket - 1, 0), len(self.counts) - 1)] += count
+        self.total += value * count
+
+    def quantile(self, q: float) -> float:
+        # upper edge of the bucket holding the q-th value
+        if self.count == 0:
+            return 0.0
+        rank: int = int(
+            np.searchsorted(np.cumsum(self.counts), q * self.count)
+        )
+        return float(self.edges[min(rank, len(self.counts) - 1) + 1])
+
+    def clear(self) -> None:
+        self.counts[:] = 0
+        self.total = 0.0
+
+    def __str__(self) -> str:
+        lines: List[str] = []
+        for i, count in enumerate(self.counts):
+            if count:
+                lines.append(
+                    "[{:.6g}, {:.6g}) {}".format(
+                        self.edges[i], self.edges[i + 1], count
+                    )
+                )
+        return "\n".join(lines)
+
+
+class InferenceClient(Agent):
+    # Stands in for the served agent inside an Env: every decision is sent
+    # to the server and waits for the action it sends back. Clients of a
+    # process server are handed to worker processes when these are created.
+    def __init__(
+        self, client_id: int, requests: queue.Queue, responses: queue.Queue
+    ) -> None:
+        super().__init__()
+        self.client_id: int = client_id
+        self.requests: queue.Queue = requests
+        self.responses: queue.Queue = responses
+
+    def act(self, obs: np.ndarray, legal_mask: int) -> int:
+        self.requests.put(
+            (self.client_id, time.perf_counter(), obs, legal_mask)
+        )
+        action: int | str = self.responses.get()
+        if isinstance(action, str):
+            raise RuntimeError("inference server failed:\n" + action)
+        return action
+
+    def step(self, state: dict) -> int:
+        return self.act(state["obs"], self.__legal_mask(state))
+
+    def eval_step(self, state: dict) -> Tuple[int, dict]:
+        return self.step(state), {}
+
+    @staticmethod
+    def __legal_mask(state: dict) -> int:
+        legal_mask: int | None = getattr(state, "legal_mask", None)
+        if legal_mask is not None:
+            return legal_mask
+        result: int = 0
+        for action in state["legal_actions"]:
+            result |= 1 << action
+        return result
+
+
+class InferenceServer:
+    # Coalesces the decisions of many concurrent environments into batches.
+    # A batch is closed once it holds max_batch_size requests or max_wait
+    # seconds after its first request came in, then answered with a single
+    # batch_step or batch_eval_step of the agent, so a DQNAgent runs one
+    # forward pass of its network per batch.
+    def __init__(
+        self,
+        agent: Agent,
+        num_actions: int,
+        max_batch_size: int = 64,
+        max_wait: float = 0.001,
+        is_training: bool = False,
+        processes: bool = False,
+    ) -> None:
+        self.agent: Agent = agent
+        self.num_actions: int = num_actions
+        self.max_batch_size: int = max_batch_size
+        self.max_wait: float = max_wait
+        self.is_training: bool = is_training
+        self.processes: bool = processes
+
+        # threads share plain queues, processes need multiprocessing ones
+        self.requests: queue.Queue = self.__queue()
+        self.clients: List[InferenceClient] = []
+
+        # latency runs from submitting a request to sending its action
+        self.latency: Histogram = Histogram.geometric(1e-5, 10.0, 60)
+        self.batch_size: Histogram = Histogram.linear(1, max_batch_size)
+        self.thread: threading.Thread | None = None
+
+    def __queue(self) -> queue.Queue:
+        if self.processes:
+            return multiprocessing.Queue()
+        return queue.Queue()
+
+    def __enter__(self) -> "InferenceServer":
+        self.start()
+        return self
+
+    def __exit__(self, type, value, trace) -> None:
+        self.stop()
+
+    def client(self) -> InferenceClient:
+        result: InferenceClient = InferenceClient(
+            len(self.clients), self.requests, self.__queue()
+        )
+        self.clients.append(result)
+        return result
+
+    def start(self) -> None:
+        assert self.thread is None
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        if self.thread is None:
+            return
+        self.requests.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def serve(self) -> None:
+        running: bool = True
+        while running:
+            request = self.requests.get()
+            if request is None:
+                break
+            batch: List[Tuple[int, float, np.ndarray, int]] = [request]
+
+            deadline: float = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout: float = deadline - time.perf_counter()
+                try:
+                    if timeout > 0:
+                        request = self.requests.get(timeout=timeout)
+                    else:
+                        request = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    running = False
+                    break
+                batch.append(request)
+
+            try:
+                self.__answer(batch)
+            except Exception:
+                # waiting clients get the error instead of hanging
+                message: str = traceback.format_exc()
+                for client_id, _, _, _ in batch:
+                    self.clients[client_id].responses.put(message)
+
+    def __answer(
+        self, batch: List[Tuple[int, float, np.ndarray, int]]
+    ) -> None:
+        obs: np.ndarray = np.stack([request[2] for request in batch])
+        legal_masks: np.ndarray = (
+            np.array([request[3] for request in batch])[:, None]
+            >> np.arange(self.num_actions)
+        ) & 1 == 1
+
+        actions: np.ndarray
+        if self.is_training:
+            actions = self.agent.batch_step(obs, legal_masks)
+        else:
+            actions = self.agent.batch_eval_step(obs, legal_masks)
+
+        for (client_id, submitted, _, _), action in zip(batch, actions):
+            self.clients[client_id].responses.put(int(action))
+            self.latency.add(time.perf_counter() - submitted)
+        self.batch_size.add(len(batch))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "requests": self.latency.count,
+            "batches": self.batch_size.count,
+            "mean_batch_size": self.batch_size.mean,
+            "mean_latency": self.latency.mean,
+            "p50_latency": self.latency.quantile(0.5),
+            "p99_latency": self.latency.quantile(0.99),
+        }
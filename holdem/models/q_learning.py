@@ -11,7 +11,7 @@
 # Student side autograding was added by Brad Miller, Nick Hay, and
 # Pieter Abbeel (pabbeel@cs.berkeley.edu).
 import numpy as np
-from .agent import Agent
+from .agent import Agent, sample_legal
 import json
 import itertools
 
@@ -85,6 +85,26 @@ class QLearningAgent(Agent):
         #     self.save(self.q_table_path)
         return action, info
     
+    def batch_step(self, obs, legal_masks):
+        actions = sample_legal(np.asarray(legal_masks, dtype=bool))
+        greedy = np.random.rand(len(actions)) > self.epsilon
+        for i in np.flatnonzero(greedy):
+            # unseen pairs are worth 0, looked up without adding entries
+            state = tuple(obs[i])
+            tmp = np.array(
+                [
+                    self.q_table.get((state, action), 0.0)
+                    for action in range(self.num_actions)
+                ]
+            )
+            if tmp.max() != 0:
+                actions[i] = tmp.argmax()
+        return actions
+
+    def batch_eval_step(self, obs, legal_masks):
+        self.step_count += len(obs)
+        return self.batch_step(obs, legal_masks)
+
     def feed(self, ts):
         (state, action, reward, next_state, done) = tuple(ts)
         self.update(state, action, next_state, reward)
@@ -1,5 +1,5 @@
 import numpy as np
-from .agent import Agent
+from .agent import Agent, sample_legal
 
 
 class RandomAgent(Agent):
@@ -23,3 +23,9 @@ class RandomAgent(Agent):
         }
 
         return self.step(state), info
+
+    def batch_step(self, obs, legal_masks):
+        return sample_legal(np.asarray(legal_masks, dtype=bool))
+
+    def batch_eval_step(self, obs, legal_masks):
+        return self.batch_step(obs, legal_masks)
@@ -1,13 +1,11 @@
 import copy
 from typing import List
 import numpy as np
-from .agent import Agent
+from .agent import Agent, sample_legal
 from multiprocessing import Pool
-from ..environment.hand import Hand
-from ..environment.card import index_map
-
-
-__weights = [0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+from ..environment.equity import category_weights, exact_score
+from ..environment.evaluator import evaluate_cards, strength_category
+from ..environment.hand import evaluate_batch
 
 
 def sample_future(card_indexes: List[int]):
@@ -17,16 +15,49 @@ def sample_future(card_indexes: List[int]):
             remain_indexes.pop(np.random.randint(0, len(remain_indexes)))
         )
 
-    cards: List[str] = list(map(lambda x: index_map[x], card_indexes))
+    return category_weights[strength_category(evaluate_cards(card_indexes))]
+
+
+def sample_scores(
+    cards: np.ndarray, iter_num: int, chunk_size: int = 64
+) -> np.ndarray:
+    # sample_score of every row of cards, chunk_size rows per batch so the
+    # draws of a large batch stay small
+    cards = np.asarray(cards)
+    num_rows, num_cards = cards.shape
+    missing = 7 - num_cards
+    scores = np.empty(num_rows)
+    for start in range(0, num_rows, chunk_size):
+        chunk = cards[start : start + chunk_size]
+        known = np.repeat(chunk, iter_num, axis=0)
+        keys = np.random.rand(len(known), 52)
+        keys[np.arange(len(known))[:, None], known] = 2
+        draws = np.argpartition(keys, missing - 1, axis=1)[:, :missing]
+        categories, _ = evaluate_batch(np.concatenate([known, draws], axis=1))
+        scores[start : start + len(chunk)] = (
+            category_weights[categories].reshape(len(chunk), -1).mean(axis=1)
+        )
+    return scores
+
 
-    return __weights[Hand(cards).evaluate().value]
+def sample_score(card_indexes: List[int], iter_num: int) -> float:
+    # the mean of iter_num sample_future draws, scored in one batch
+    return float(sample_scores(np.array([card_indexes]), iter_num)[0])
 
 
 class RuleBasedAgent(Agent):
-    def __init__(self, num_actions,iter_num=1000):
+    def __init__(self, num_actions, iter_num=1000, mode="sampled"):
+        assert mode in ("sampled", "exact")
         self.num_actions = num_actions
-        self.thread_pool = Pool()
-        self.iter_num=iter_num
+        self.iter_num = iter_num
+        self.mode = mode
+        self.thread_pool = Pool() if mode == "sampled" else None
+
+    def __getstate__(self):
+        # a pool cannot cross processes, copies sample in their own process
+        state = self.__dict__.copy()
+        state["thread_pool"] = None
+        return state
 
     def step(self, state):
         # state space
@@ -60,9 +91,7 @@ class RuleBasedAgent(Agent):
                 else:
                     action = 1
         if num_cards == 7:
-            level = (
-                Hand(list(map(lambda x: index_map[x], cards))).evaluate().value
-            )
+            level = strength_category(evaluate_cards(cards))
             if level == 1:
                 action = 2
             elif level <= 3:
@@ -78,7 +107,8 @@ class RuleBasedAgent(Agent):
             elif level <= 7:
                 action = 1
 
-        score = self.calculate_sum(cards)
+        if num_cards == 5 or num_cards == 6:
+            score = self.calculate_sum(cards)
         if num_cards == 5:
             if score < 4:
                 action = 2
@@ -128,8 +158,71 @@ class RuleBasedAgent(Agent):
 
         return self.step(state), info
 
+    def batch_step(self, obs, legal_masks):
+        # the rules of step, applied to a whole batch at once
+        obs = np.asarray(obs)
+        legal_masks = np.asarray(legal_masks, dtype=bool)
+        present = obs[:, :52] == 1
+        num_cards = present.sum(axis=1)
+        # card ids in increasing order, like the list step builds
+        cards = np.argsort(~present, axis=1, kind="stable")[:, :7]
+        can_call = legal_masks[:, 0]
+        can_check = legal_masks[:, 3]
+        check_or_fold = np.where(can_check, 3, 2)
+        call_or_raise = np.where(can_call, 0, 1)
+
+        actions = np.full(len(obs), -1)
+
+        preflop = num_cards == 2
+        pair = cards[:, 0] % 13 == cards[:, 1] % 13
+        actions[preflop] = np.where(pair, 1, call_or_raise)[preflop]
+
+        river = np.flatnonzero(num_cards == 7)
+        if len(river) > 0:
+            level, _ = evaluate_batch(cards[river])
+            actions[river] = np.select(
+                [level == 1, level <= 3, level <= 5, level <= 7],
+                [2, check_or_fold[river], call_or_raise[river], 1],
+                -1,
+            )
+
+        for size, thresholds in ((5, (4, 15, 25)), (6, (3, 10, 20))):
+            rows = np.flatnonzero(num_cards == size)
+            if len(rows) == 0:
+                continue
+            if self.mode == "exact":
+                score = np.array(
+                    [exact_score(cards[row, :size].tolist()) for row in rows]
+                )
+            else:
+                score = sample_scores(cards[rows, :size], self.iter_num)
+            actions[rows] = np.select(
+                [
+                    score < thresholds[0],
+                    score < thresholds[1],
+                    score < thresholds[2],
+                ],
+                [2, check_or_fold[rows], call_or_raise[rows]],
+                1,
+            )
+
+        unmatched = actions == -1
+        if unmatched.any():
+            actions[unmatched] = sample_legal(legal_masks[unmatched])
+        return actions
+
+    def batch_eval_step(self, obs, legal_masks):
+        return self.batch_step(obs, legal_masks)
+
     def calculate_sum(self, cards):
+        if self.mode == "exact":
+            return exact_score(cards)
+
+        if self.thread_pool is None:
+            return sample_score(cards, self.iter_num)
+
         sample_result = self.thread_pool.starmap(
-            sample_future, [(copy.deepcopy(cards),) for _ in range(self.iter_num)]
+            sample_future,
+            [(copy.deepcopy(cards),) for _ in range(self.iter_num)],
         )
         return sum(sample_result) / self.iter_num
@@ -43,7 +43,9 @@ class Logger:
         if self.verbose:
             print(text)
 
-    def log_perf(self, episode: int, reward: float) -> None:
+    def log_perf(
+        self, episode: int, reward: float, stderr: float | None = None
+    ) -> None:
         if self.verbose:
             print("")
 
@@ -51,6 +53,8 @@ class Logger:
         self.log("----------------------------------------")
         self.log(f"  episode      |  {episode}")
         self.log(f"  reward       |  {reward}")
+        if stderr is not None:
+            self.log(f"  95% CI       |  {reward} +/- {1.96 * stderr}")
         self.log("----------------------------------------")
 
     def log_history(
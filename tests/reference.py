@@ -0,0 +1,217 @@
+from itertools import combinations
+from typing import List, Tuple
+
+from numpy.random import RandomState
+
+from holdem.environment.card import index_map, rank_map
+from holdem.environment.evaluator import (
+    FLUSH,
+    FOUR_OF_A_KIND,
+    FULL_HOUSE,
+    HIGH_CARD,
+    ONE_PAIR,
+    STRAIGHT,
+    STRAIGHT_FLUSH,
+    THREE_OF_A_KIND,
+    TWO_PAIRS,
+)
+
+# Straightforward versions of the rules the engine implements with lookup
+# tables, kept as close as possible to the original list-based game.
+
+CALL: int = 0
+RAISE: int = 1
+FOLD: int = 2
+CHECK: int = 3
+
+
+def naive_five(cards: List[str]) -> int:
+    # strength of exactly five cards, worked out from the card strings
+    ranks: List[int] = sorted((rank_map[card[1]] - 2 for card in cards))
+    counts = {rank: ranks.count(rank) for rank in ranks}
+    # ranks ordered by how often they appear, then by rank
+    groups: List[int] = sorted(counts, key=lambda r: (counts[r], r))[::-1]
+    shape: List[int] = sorted(counts.values(), reverse=True)
+
+    flush: bool = len({card[0] for card in cards}) == 1
+    high: int = -1
+    if len(counts) == 5 and ranks[4] - ranks[0] == 4:
+        high = ranks[4]
+    elif ranks == [0, 1, 2, 3, 12]:
+        high = 3
+
+    if high >= 0:
+        packed: List[int] = [STRAIGHT_FLUSH if flush else STRAIGHT, high]
+    elif flush:
+        packed = [FLUSH] + groups
+    elif shape == [4, 1]:
+        packed = [FOUR_OF_A_KIND] + groups
+    elif shape == [3, 2]:
+        packed = [FULL_HOUSE] + groups
+    elif shape == [3, 1, 1]:
+        packed = [THREE_OF_A_KIND] + groups
+    elif shape == [2, 2, 1]:
+        packed = [TWO_PAIRS] + groups
+    elif shape == [2, 1, 1, 1]:
+        packed = [ONE_PAIR] + groups
+    else:
+        packed = [HIGH_CARD] + groups
+
+    result: int = packed[0]
+    for i in range(5):
+        result = (result << 4) | (packed[i + 1] if i + 1 < len(packed) else 0)
+    return result
+
+
+def naive_best(cards: List[str]) -> int:
+    return max(naive_five(list(five)) for five in combinations(cards, 5))
+
+
+def split_pot(
+    in_chips: List[int], winners: List[int], random: RandomState
+) -> Tuple[List[int], List[int]]:
+    # peels the smallest contribution off every player still in
+    num_players: int = len(in_chips)
+    winner_count: int = sum(
+        (winners[i] and in_chips[i] > 0) for i in range(num_players)
+    )
+    player_count: int = sum(in_chips[i] > 0 for i in range(num_players))
+
+    if winner_count == 0 or winner_count == player_count:
+        return list(in_chips), [0 for _ in range(num_players)]
+
+    bet: int = min(v for v in in_chips if v > 0)
+    earn, remaining = divmod(bet * player_count, winner_count)
+    earns: List[int] = [0 for _ in range(num_players)]
+    remains: List[int] = list(in_chips)
+    for i in range(num_players):
+        if in_chips[i] == 0:
+            continue
+        if winners[i]:
+            earns[i] += earn
+        remains[i] -= bet
+
+    if remaining > 0:
+        random_winner = random.choice(
+            [i for i in range(num_players) if winners[i] and in_chips[i] > 0]
+        )
+        earns[random_winner] += remaining
+    return earns, remains
+
+
+def split_pots(
+    in_chips: List[int], winners: List[int], random: RandomState
+) -> List[int]:
+    earns: List[int] = [0 for _ in range(len(in_chips))]
+    while any(v > 0 for v in in_chips):
+        profits, in_chips = split_pot(in_chips, winners, random)
+        earns = [earns[i] + profits[i] for i in range(len(in_chips))]
+    return earns
+
+
+class ReferenceGame:
+    # Limit hold'em dealt from a fixed card order, one list per field.
+    def __init__(
+        self,
+        num_players: int,
+        random: RandomState,
+        small_blind: int = 1,
+        allowed_raise: int = 4,
+    ) -> None:
+        self.num_players: int = num_players
+        self.random: RandomState = random
+        self.small_blind: int = small_blind
+        self.big_blind: int = 2 * small_blind
+        self.allowed_raise: int = allowed_raise
+
+    def reset(self, cards: List[int], small_starter: int) -> int:
+        self.deck: List[int] = list(cards)
+        self.hands: List[List[int]] = [[] for _ in range(self.num_players)]
+        for i in range(2 * self.num_players):
+            self.hands[i % self.num_players].append(self.deck.pop(0))
+        self.public_cards: List[int] = []
+        self.folded: List[bool] = [False for _ in range(self.num_players)]
+        self.in_chips: List[int] = [0 for _ in range(self.num_players)]
+
+        big_starter: int = (small_starter + 1) % self.num_players
+        self.in_chips[big_starter] = self.big_blind
+        self.in_chips[small_starter] = self.small_blind
+
+        self.turn_id: int = (big_starter + 1) % self.num_players
+        self.raise_amount: int = self.big_blind
+        self.have_raised: int = 0
+        self.not_raised: int = 0
+        self.player_raises: List[int] = list(self.in_chips)
+        self.round_id: int = 0
+        return self.turn_id
+
+    def legal_actions(self) -> List[int]:
+        actions: List[int] = [CALL, RAISE, FOLD, CHECK]
+        if self.have_raised >= self.allowed_raise:
+            actions.remove(RAISE)
+        if self.player_raises[self.turn_id] < max(self.player_raises):
+            actions.remove(CHECK)
+        if self.player_raises[self.turn_id] == max(self.player_raises):
+            actions.remove(CALL)
+        return actions
+
+    def step(self, action: int) -> int:
+        highest: int = max(self.player_raises)
+        if action == CALL:
+            self.in_chips[self.turn_id] += (
+                highest - self.player_raises[self.turn_id]
+            )
+            self.player_raises[self.turn_id] = highest
+            self.not_raised += 1
+        elif action == RAISE:
+            self.in_chips[self.turn_id] += (
+                highest - self.player_raises[self.turn_id] + self.raise_amount
+            )
+            self.player_raises[self.turn_id] = highest + self.raise_amount
+            self.have_raised += 1
+            self.not_raised = 1
+        elif action == FOLD:
+            self.folded[self.turn_id] = True
+        else:
+            self.not_raised += 1
+
+        self.turn_id = (self.turn_id + 1) % self.num_players
+        while self.folded[self.turn_id]:
+            self.turn_id = (self.turn_id + 1) % self.num_players
+
+        if self.not_raised >= self.num_players:
+            if self.round_id == 0:
+                for _ in range(3):
+                    self.public_cards.append(self.deck.pop(0))
+            elif self.round_id <= 2:
+                self.public_cards.append(self.deck.pop(0))
+            if self.round_id == 1:
+                self.raise_amount *= 2
+            self.round_id += 1
+            self.have_raised = 0
+            self.not_raised = 0
+            self.player_raises = [0 for _ in range(self.num_players)]
+        return self.turn_id
+
+    def strength(self, player: int) -> int:
+        cards: List[int] = self.hands[player] + self.public_cards
+        return naive_best([index_map[card] for card in cards])
+
+    def is_over(self) -> bool:
+        return self.folded.count(False) == 1 or self.round_id >= 4
+
+    def payoffs(self) -> List[float]:
+        if self.folded.count(False) == 1:
+            # the last player standing wins without a showdown
+            winners: List[int] = [int(not f) for f in self.folded]
+        else:
+            strengths: List[int] = [
+                -1 if self.folded[i] else self.strength(i)
+                for i in range(self.num_players)
+            ]
+            winners = [int(s == max(strengths)) for s in strengths]
+        earns: List[int] = split_pots(self.in_chips, winners, self.random)
+        return [
+            (earns[i] - self.in_chips[i]) / self.big_blind
+            for i in range(self.num_players)
+        ]
@@ -0,0 +1,75 @@
+from typing import List
+
+from holdem.environment.card import card_map
+from holdem.environment.compare import compare_cards, compare_hands
+
+
+def deal(hole: List[str], board: List[str]) -> List[str]:
+    return hole + board
+
+
+def test_equal_full_houses_split() -> None:
+    board: List[str] = ["SK", "HK", "DK", "SQ", "H2"]
+    # queens full for both, the other hole cards never play
+    assert compare_hands(
+        [deal(["HQ", "C3"], board), deal(["DQ", "C4"], board)]
+    ) == [1, 1]
+
+
+def test_higher_full_house_wins() -> None:
+    board: List[str] = ["SK", "HK", "DQ", "SQ", "H2"]
+    assert compare_hands(
+        [deal(["CK", "C3"], board), deal(["CQ", "C4"], board)]
+    ) == [1, 0]
+    # trips over the same pair decide before the pair
+    assert compare_hands(
+        [deal(["CQ", "D2"], board), deal(["CK", "S2"], board)]
+    ) == [0, 1]
+
+
+def test_kicker_ties() -> None:
+    board: List[str] = ["SA", "HK", "D9", "S7", "H4"]
+    # the fifth card is the king, ties past it do not matter
+    assert compare_hands(
+        [deal(["CA", "C2"], board), deal(["DA", "C3"], board)]
+    ) == [1, 1]
+    # a kicker inside the best five decides
+    assert compare_hands(
+        [deal(["CA", "CQ"], board), deal(["DA", "CJ"], board)]
+    ) == [1, 0]
+
+
+def test_board_plays() -> None:
+    board: List[str] = ["S9", "HT", "DJ", "SQ", "HK"]
+    assert compare_hands(
+        [
+            deal(["C2", "C3"], board),
+            deal(["D4", "D5"], board),
+            deal(["H6", "S2"], board),
+        ]
+    ) == [1, 1, 1]
+    # an ace on top of the board straight beats it
+    assert compare_hands(
+        [deal(["C2", "C3"], board), deal(["CA", "D5"], board)]
+    ) == [0, 1]
+
+
+def test_folded_players() -> None:
+    board: List[str] = ["S9", "HT", "DJ", "SQ", "HK"]
+    assert compare_hands(
+        [None, deal(["C2", "C3"], board), deal(["D4", "D5"], board)]
+    ) == [0, 1, 1]
+    # the last player standing wins without a showdown
+    assert compare_hands([None, deal(["C2", "C3"], board), None]) == [0, 1, 0]
+
+
+def test_compare_cards_matches_compare_hands() -> None:
+    board: List[str] = ["SK", "HK", "DK", "SQ", "H2"]
+    hands: List[List[str]] = [
+        deal(["HQ", "C3"], board),
+        deal(["DQ", "C4"], board),
+        deal(["C2", "D2"], board),
+    ]
+    assert compare_cards(
+        [[card_map[card] for card in hand] for hand in hands]
+    ) == compare_hands(hands)
@@ -0,0 +1,34 @@
+import pickle
+
+import numpy as np
+
+from holdem.models.dqn import DQNAgent
+
+
+def test_pickled_agent_leaves_memory_behind() -> None:
+    agent: DQNAgent = DQNAgent(
+        replay_memory_size=20000,
+        num_actions=4,
+        state_shape=[72],
+        mlp_layers=[64, 64],
+        device="cpu",
+    )
+    for i in range(10):
+        agent.feed_memory(
+            np.full(72, i % 2), i % 4, 0.0, np.zeros(72), [0, 3], False
+        )
+
+    # 20000 empty rows alone pickle to about 13 MB
+    payload: bytes = pickle.dumps([agent])
+    assert len(payload) < 2000000
+    (copy,) = pickle.loads(payload)
+    assert copy.memory is None
+    assert len(agent.memory) == 10
+
+    obs: np.ndarray = (
+        np.random.default_rng(0).integers(2, size=(16, 72)).astype(np.float32)
+    )
+    masks: np.ndarray = np.ones((16, 4), dtype=bool)
+    assert np.array_equal(
+        copy.batch_eval_step(obs, masks), agent.batch_eval_step(obs, masks)
+    )
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from holdem.environment.evaluation import (
+    PayoffStats,
+    evaluate_sequential,
+    sequential_z,
+)
+from holdem.models import RandomAgent
+
+
+def test_sequential_z_bounds_the_error_over_all_looks() -> None:
+    assert sequential_z(1.96, 1) == pytest.approx(1.96, abs=1e-3)
+
+    # z statistics of a zero-mean walk looked at after each of 20 batches
+    rng: np.random.Generator = np.random.default_rng(0)
+    sums: np.ndarray = rng.standard_normal((20000, 20)).cumsum(axis=1)
+    scores: np.ndarray = np.abs(sums) / np.sqrt(np.arange(1, 21))
+    # the share of walks where some look crosses the boundary
+    assert (scores > 1.96).any(axis=1).mean() > 0.15
+    assert (scores > sequential_z(1.96, 20)).any(axis=1).mean() < 0.05
+
+
+def test_identical_agents_rarely_stop_early() -> None:
+    # 19 looks per run; at a fixed z of 1.96 six of these runs stop
+    stops: int = 0
+    for seed in range(30):
+        stats: PayoffStats = evaluate_sequential(
+            [RandomAgent(4), RandomAgent(4)],
+            max_games=1000,
+            seed=seed,
+            num_workers=1,
+            batch_size=50,
+            min_games=100,
+        )
+        stops += stats.count < 1000
+    assert stops <= 3
+
+
+def test_duplicate_counts_deals_and_hands() -> None:
+    stats: PayoffStats = evaluate_sequential(
+        [RandomAgent(4), RandomAgent(4), RandomAgent(4)],
+        max_games=60,
+        num_players=3,
+        num_workers=1,
+        batch_size=30,
+        min_games=60,
+        duplicate=True,
+    )
+    # every deal is played once for each of the six seat rotations
+    assert (stats.count, stats.hands) == (60, 360)
@@ -0,0 +1,75 @@
+import random
+from typing import List
+
+import pytest
+
+from holdem.environment.card import card_map, index_map
+from holdem.environment.evaluator import (
+    FULL_HOUSE,
+    STRAIGHT,
+    STRAIGHT_FLUSH,
+    evaluate_cards,
+    strength_category,
+    strength_ranks,
+)
+
+from .reference import naive_best
+
+
+def evaluate(cards: List[str]) -> int:
+    return evaluate_cards([card_map[card] for card in cards])
+
+
+@pytest.mark.parametrize("size", [5, 6, 7])
+def test_matches_best_of_five_subsets(size: int) -> None:
+    rng: random.Random = random.Random(size)
+    for _ in range(3000):
+        cards: List[str] = [index_map[i] for i in rng.sample(range(52), size)]
+        assert evaluate(cards) == naive_best(cards), cards
+
+
+def test_matches_on_rank_heavy_hands() -> None:
+    # few ranks and suits, so most hands hold pairs, trips, quads and flushes
+    rng: random.Random = random.Random(7)
+    for _ in range(3000):
+        ranks: List[str] = rng.sample("A23456789TJQK", 3)
+        suits: List[str] = rng.sample("SHDC", 2)
+        pool: List[str] = sorted(
+            {s + r for s in "SHDC" for r in ranks}
+            | {s + r for s in suits for r in "A23456789TJQK"}
+        )
+        cards: List[str] = rng.sample(pool, 7)
+        assert evaluate(cards) == naive_best(cards), cards
+
+
+def test_wheel_straight() -> None:
+    strength: int = evaluate(["SA", "H2", "D3", "C4", "S5", "HK", "DQ"])
+    assert strength_category(strength) == STRAIGHT
+    assert strength_ranks(strength)[0] == 3
+    # the wheel is the lowest straight
+    assert strength < evaluate(["S2", "H3", "D4", "C5", "S6", "HK", "DQ"])
+
+
+def test_straight_flush() -> None:
+    steel_wheel: int = evaluate(["HA", "H2", "H3", "H4", "H5", "SA", "DA"])
+    assert strength_category(steel_wheel) == STRAIGHT_FLUSH
+    assert strength_ranks(steel_wheel)[0] == 3
+
+    # a straight flush beats the quads in the same seven cards
+    royal: int = evaluate(["ST", "SJ", "SQ", "SK", "SA", "HA", "DA"])
+    assert strength_category(royal) == STRAIGHT_FLUSH
+    assert royal > steel_wheel
+    assert royal > evaluate(["ST", "SJ", "SQ", "CA", "SA", "HA", "DA"])
+
+
+def test_full_house_ties() -> None:
+    # the third pair never plays
+    kings_full: int = evaluate(["SK", "HK", "DK", "SQ", "HQ", "S2", "H2"])
+    assert strength_category(kings_full) == FULL_HOUSE
+    assert kings_full == evaluate(["SK", "HK", "DK", "SQ", "HQ", "SJ", "HJ"])
+
+    # two trips make a full house of the higher over the lower
+    aces_full: int = evaluate(["SA", "HA", "DA", "SK", "HK", "DK", "C2"])
+    assert strength_category(aces_full) == FULL_HOUSE
+    assert strength_ranks(aces_full)[:2] == [12, 11]
+    assert aces_full > kings_full
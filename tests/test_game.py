@@ -0,0 +1,250 @@
+from typing import List
+
+import numpy as np
+import pytest
+from numpy.random import RandomState
+
+from holdem.environment import Env
+from holdem.environment.game import (
+    BettingTable,
+    HoldemDealer,
+    HoldemGame,
+    VecHoldemGame,
+    betting_table,
+)
+
+from .reference import ReferenceGame
+
+
+def random_deal(
+    rng: RandomState, num_players: int, board: List[int] | None = None
+) -> List[int]:
+    # every card a hand can use: the hole cards, then the board
+    if board is None:
+        return rng.permutation(52)[: 2 * num_players + 5].tolist()
+    rest: List[int] = [card for card in range(52) if card not in board]
+    return rng.permutation(rest)[: 2 * num_players].tolist() + board
+
+
+@pytest.mark.parametrize("num_players", [2, 3, 4, 5, 6])
+def test_matches_reference_rules(num_players: int) -> None:
+    rng: RandomState = RandomState(num_players)
+    # both judgers draw odd chips from identically seeded streams
+    game: HoldemGame = HoldemGame(num_players, random=RandomState(0))
+    reference: ReferenceGame = ReferenceGame(num_players, RandomState(0))
+
+    for deal in range(300):
+        # every other board is a royal flush, so showdowns split the pot
+        # and layers paid by folded players leave odd chips
+        cards: List[int] = random_deal(
+            rng, num_players, [9, 10, 11, 12, 0] if deal % 2 else None
+        )
+        small_starter: int = rng.randint(num_players)
+        game.reset(cards, small_starter)
+        reference.reset(cards, small_starter)
+
+        while not game.is_over():
+            assert not reference.is_over()
+            assert game.turn_id == reference.turn_id
+            legal_actions: List[int] = [int(a) for a in game.legal_actions()]
+            assert legal_actions == reference.legal_actions()
+            assert [p.in_chips for p in game.players] == reference.in_chips
+            assert game.public_cards == reference.public_cards
+
+            # folds are rare, so most hands reach the showdown
+            weights: np.ndarray = np.array(
+                [0.2 if a == 2 else 1.0 for a in legal_actions]
+            )
+            action: int = legal_actions[
+                rng.choice(len(legal_actions), p=weights / weights.sum())
+            ]
+            game.step(action)
+            reference.step(action)
+
+        assert reference.is_over()
+        assert game.public_cards == reference.public_cards
+        assert game.payoffs() == reference.payoffs()
+
+
+def test_deal_after_preset_shuffle() -> None:
+    dealer: HoldemDealer = HoldemDealer(RandomState(5))
+    for cards in ([], [51, 0, 17], [3, 2, 1, 0], list(range(51, 40, -1))):
+        dealer.shuffle(cards)
+        dealt: List[int] = [dealer.deal() for _ in range(52)]
+        # presets come out first and in order, then the rest of the deck
+        assert dealt[: len(cards)] == cards
+        assert sorted(dealt) == list(range(52))
+
+    # the deck keeps its last permutation, presets still come out first
+    dealer.shuffle([7, 8])
+    assert [dealer.deal(), dealer.deal()] == [7, 8]
+    assert len({dealer.deal() for _ in range(50)} | {7, 8}) == 52
+
+
+def test_preset_deal_in_game() -> None:
+    game: HoldemGame = HoldemGame(3, random=RandomState(1))
+    cards: List[int] = [10, 20, 30, 11, 21, 31, 40, 41, 42, 43, 44]
+    game.reset(cards, small_starter=2)
+    assert [p.hand for p in game.players] == [[10, 11], [20, 21], [30, 31]]
+    # small blind at seat 2, big blind at seat 0, seat 1 acts first
+    assert [p.in_chips for p in game.players] == [2, 0, 1]
+    assert game.turn_id == 1
+
+    while not game.is_over():
+        legal_actions: List[int] = [int(a) for a in game.legal_actions()]
+        game.step(0 if 0 in legal_actions else 3)
+    assert game.public_cards == [40, 41, 42, 43, 44]
+
+
+def game_view(game: HoldemGame) -> tuple:
+    # everything a player or the judger can tell about the game
+    return (
+        [(p.hand, p.status, p.in_chips) for p in game.players],
+        list(game.public_cards),
+        game.turn_id,
+        game.round_id,
+        list(game.last_raises),
+        list(game.round.player_raises),
+        game.round.have_raised,
+        game.round.not_raised,
+        game.round.raise_amount,
+        game.dealer.cursor,
+        game.dealer.preset,
+        [int(a) for a in game.legal_actions()],
+    )
+
+
+def play_out(game: HoldemGame, actions: List[int]) -> tuple:
+    # plays the given choices, taken modulo the number of legal actions
+    views: List[tuple] = []
+    for choice in actions:
+        if game.is_over():
+            break
+        legal_actions = game.legal_actions()
+        game.step(legal_actions[choice % len(legal_actions)])
+        views.append(game_view(game))
+    return views, game.is_over() and game.payoffs()
+
+
+@pytest.mark.parametrize("num_players", [2, 3, 6])
+def test_restore_plays_the_same_continuation(num_players: int) -> None:
+    rng: RandomState = RandomState(10 + num_players)
+    game: HoldemGame = HoldemGame(num_players, random=RandomState(3))
+    for deal in range(100):
+        # the hole cards and part of the board are preset, the rest of the
+        # board comes from the random state
+        preset: int = 2 * num_players + deal % 6
+        game.reset(rng.permutation(52)[:preset].tolist())
+        before: List[int] = rng.randint(4, size=rng.randint(12)).tolist()
+        after: List[int] = rng.randint(4, size=40).tolist()
+        play_out(game, before)
+        if game.is_over():
+            continue
+
+        record: np.ndarray = game.snapshot()
+        view: tuple = game_view(game)
+        random_state = game.random.get_state()
+        expected = play_out(game, after)
+
+        for state in (record, bytes(record)):
+            fresh: HoldemGame = HoldemGame(num_players, random=RandomState())
+            for target in (game, fresh):
+                target.restore(state)
+                target.random.set_state(random_state)
+                assert game_view(target) == view
+                assert bytes(target.snapshot()) == bytes(record)
+                assert play_out(target, after) == expected
+
+
+def test_vec_game_matches_holdem_game() -> None:
+    rng: RandomState = RandomState(7)
+    vec: VecHoldemGame = VecHoldemGame(32, random=RandomState(5))
+    vec.reset()
+    # one scalar game per row, dealt the cards the row drew
+    envs: List[Env] = [Env([], 2) for _ in range(vec.num_games)]
+
+    def mirror(i: int) -> None:
+        envs[i].reset(vec.cards[i].tolist(), int(vec.turn_id[i]))
+
+    for i in range(vec.num_games):
+        mirror(i)
+
+    finished: int = 0
+    for _ in range(200):
+        obs: np.ndarray = vec.observations()
+        masks: np.ndarray = vec.legal_masks()
+        for i, env in enumerate(envs):
+            assert env.game.turn_id == vec.turn_id[i]
+            assert env.legal_mask() == masks[i]
+            assert np.array_equal(env.observe(env.game.turn_id), obs[i])
+
+        # one action in ten is drawn from all four, so some are illegal
+        # and take the check or fold fallback
+        actions: np.ndarray = rng.randint(4, size=vec.num_games)
+        for i, env in enumerate(envs):
+            legal_actions: List[int] = [
+                int(a) for a in env.game.legal_actions()
+            ]
+            if rng.rand() > 0.1:
+                actions[i] = legal_actions[rng.randint(len(legal_actions))]
+            env.step(int(actions[i]))
+
+        _, payoffs, dones = vec.step(actions)
+        for i, env in enumerate(envs):
+            assert env.is_over() == dones[i]
+            if dones[i]:
+                assert env.game.payoffs() == payoffs[i].tolist()
+                mirror(i)
+                finished += 1
+    assert finished > 500
+
+
+@pytest.mark.parametrize("num_players", [2, 3, 6])
+def test_undo_returns_to_earlier_snapshots(num_players: int) -> None:
+    rng: RandomState = RandomState(20 + num_players)
+    game: HoldemGame = HoldemGame(num_players, random=RandomState(4))
+    for _ in range(100):
+        game.reset()
+        root: bytes = bytes(game.snapshot())
+        # snapshots along the current line of play, the root first
+        path: List[bytes] = [root]
+        for _ in range(60):
+            # walk forward more often than back, so most walks close
+            # rounds and some reach the end of the hand
+            if len(path) > 1 and (game.is_over() or rng.rand() < 0.3):
+                game.undo()
+                path.pop()
+                assert bytes(game.snapshot()) == path[-1]
+            elif not game.is_over():
+                legal_actions = game.legal_actions()
+                game.apply(legal_actions[rng.randint(len(legal_actions))])
+                path.append(bytes(game.snapshot()))
+
+        while len(path) > 1:
+            game.undo()
+            path.pop()
+        assert bytes(game.snapshot()) == root
+        assert game.change_log == []
+
+
+def test_heads_up_transitions_match_the_chips() -> None:
+    rng: RandomState = RandomState(30)
+    game: HoldemGame = HoldemGame(2, random=RandomState(6))
+    table: BettingTable = betting_table(2, 4)
+    for _ in range(300):
+        game.reset()
+        while not game.is_over():
+            state: int = game.round.betting_state()
+            legal_actions = game.legal_actions()
+            action = legal_actions[rng.randint(len(legal_actions))]
+            round_id: int = game.round_id
+            game.apply(action)
+            if game.is_over() or game.round_id != round_id:
+                continue
+            # the state the table predicts is the one the chips give
+            assert table.transitions[state, action] == (
+                game.round.betting_state()
+            )
+
+    # with more players the facing bit does not follow from the state
+    assert betting_table(3, 4).transitions is None
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from holdem.environment.evaluator import evaluate_cards, strength_category
+from holdem.environment.hand import evaluate_batch
+
+
+def random_hands(rng: np.random.Generator, num_hands: int, size: int):
+    return np.argsort(rng.random((num_hands, 52)), axis=1)[:, :size]
+
+
+@pytest.mark.parametrize("size", [5, 6, 7])
+def test_evaluate_batch_matches_evaluate_cards(size: int) -> None:
+    cards: np.ndarray = random_hands(np.random.default_rng(size), 5000, size)
+    categories, strengths = evaluate_batch(cards)
+    for row, category, strength in zip(cards, categories, strengths):
+        expected: int = evaluate_cards(row.tolist())
+        assert strength == expected, row
+        assert category == strength_category(expected)
+
+
+def test_evaluate_batch_on_rank_heavy_hands() -> None:
+    # three ranks in every suit plus two full suits, so quads, full houses
+    # and flushes come up often
+    rng: np.random.Generator = np.random.default_rng(11)
+    rows = []
+    for _ in range(3000):
+        ranks = rng.choice(13, 3, replace=False)
+        suits = rng.choice(4, 2, replace=False)
+        pool = sorted(
+            {suit * 13 + rank for suit in range(4) for rank in ranks}
+            | {suit * 13 + rank for suit in suits for rank in range(13)}
+        )
+        rows.append(rng.choice(pool, 7, replace=False))
+    cards: np.ndarray = np.array(rows)
+    _, strengths = evaluate_batch(cards)
+    expected = [evaluate_cards(row.tolist()) for row in cards]
+    assert strengths.tolist() == expected
@@ -0,0 +1,46 @@
+from typing import List
+
+import numpy as np
+import pytest
+
+from holdem.environment import HandIndexer
+
+
+@pytest.mark.parametrize("round_id", [0, 1, 2, 3])
+def test_unindex_round_trips(round_id: int) -> None:
+    indexer: HandIndexer = HandIndexer(round_id)
+    rng: np.random.Generator = np.random.default_rng(round_id)
+    # every preflop index, a sample of the later rounds along with both
+    # ends of the range
+    indices: List[int] = (
+        list(range(indexer.size))
+        if indexer.size <= 2000
+        else [0, indexer.size - 1]
+        + rng.integers(indexer.size, size=2000).tolist()
+    )
+    num_cards: int = sum(indexer.groups)
+    for index in indices:
+        hole, public = indexer.unindex(index)
+        assert len(hole) == 2 and len(hole) + len(public) == num_cards
+        assert len(set(hole + public)) == num_cards
+        assert indexer.index(hole, public) == index
+
+
+@pytest.mark.parametrize("round_id", [0, 1, 2, 3])
+def test_index_is_canonical(round_id: int) -> None:
+    indexer: HandIndexer = HandIndexer(round_id)
+    rng: np.random.Generator = np.random.default_rng(10 + round_id)
+    num_cards: int = sum(indexer.groups)
+    for _ in range(2000):
+        cards: List[int] = rng.permutation(52)[:num_cards].tolist()
+        index: int = indexer.index(cards[:2], cards[2:])
+        assert 0 <= index < indexer.size
+        # the representative is the same hand up to suits
+        assert indexer.index(*indexer.unindex(index)) == index
+
+        # and so is any relabelling of the suits
+        suits: np.ndarray = rng.permutation(4)
+        relabelled: List[int] = [
+            int(suits[card // 13] * 13 + card % 13) for card in cards
+        ]
+        assert indexer.index(relabelled[:2], relabelled[2:]) == index
@@ -0,0 +1,60 @@
+from typing import List
+
+import numpy as np
+import pytest
+from numpy.random import RandomState
+
+from holdem.environment.game import HoldemJudger
+
+from .reference import split_pots
+
+
+def random_pot(rng: RandomState, num_players: int, unit: int = 1) -> tuple:
+    # few distinct contributions, so levels tie and side pots stack up
+    in_chips: List[int] = (unit * rng.randint(0, 5, size=num_players)).tolist()
+    if max(in_chips) == 0:
+        in_chips[rng.randint(num_players)] = unit
+    winners: List[int] = [
+        int(chips > 0 and rng.rand() < 0.4) for chips in in_chips
+    ]
+    if sum(winners) == 0:
+        winners[int(np.argmax(in_chips))] = 1
+    return in_chips, winners
+
+
+@pytest.mark.parametrize("num_players", [2, 3, 4, 6, 9])
+def test_split_pots_matches_peel_off(num_players: int) -> None:
+    rng: RandomState = RandomState(num_players)
+    # both draw the odd chips from identically seeded streams, so the
+    # winner of every odd chip has to match as well
+    judger: HoldemJudger = HoldemJudger(RandomState(0))
+    random: RandomState = RandomState(0)
+    draws: int = 0
+    for _ in range(1000):
+        in_chips, winners = random_pot(rng, num_players)
+        before: int = random.get_state()[2]
+        earns: List[int] = judger._HoldemJudger__split_pots(in_chips, winners)
+        assert earns == split_pots(in_chips, winners, random)
+        assert sum(earns) == sum(in_chips)
+        assert random.get_state()[2] == judger.random.get_state()[2]
+        draws += random.get_state()[2] != before
+    # heads-up, two winners always split a layer evenly
+    assert num_players == 2 or draws > 50
+
+
+@pytest.mark.parametrize("num_players", [2, 3, 4, 6])
+def test_judge_batch_matches_split_pots(num_players: int) -> None:
+    rng: RandomState = RandomState(10 + num_players)
+    judger: HoldemJudger = HoldemJudger(RandomState(0))
+    # every layer is a multiple of 60, which any number of winners up to
+    # six divides evenly, so no odd chips are drawn
+    pots = [random_pot(rng, num_players, unit=60) for _ in range(1000)]
+    in_chips: np.ndarray = np.array([pot[0] for pot in pots])
+    winners: np.ndarray = np.array([pot[1] for pot in pots])
+
+    payoffs: np.ndarray = judger.judge_batch(in_chips, winners)
+    for i, (chips, flags) in enumerate(pots):
+        earns: List[int] = judger._HoldemJudger__split_pots(chips, flags)
+        assert payoffs[i].tolist() == [
+            earns[j] - chips[j] for j in range(num_players)
+        ]
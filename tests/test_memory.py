@@ -0,0 +1,272 @@
+import pickle
+import random
+import shutil
+from typing import List
+
+import numpy as np
+import pytest
+
+from holdem.models.dqn import (
+    DQNAgent,
+    MappedMemory,
+    Memory,
+    PrioritizedMemory,
+    SumTree,
+    Transition,
+)
+
+
+def fill(memory: Memory, count: int, start: int = 0) -> None:
+    # transition i has state [i, i], reward i and action i % 4 legal
+    for i in range(start, start + count):
+        memory.save(
+            np.full(2, i), i % 4, float(i), np.full(2, i + 1), [i % 4], False
+        )
+
+
+def test_save_wraps_around() -> None:
+    memory: Memory = Memory(5, 3, state_shape=[2], num_actions=4)
+    fill(memory, 4)
+    assert (len(memory), memory.position, memory.oldest()) == (4, 4, 0)
+
+    memory = Memory(5, 3, state_shape=[2], num_actions=4)
+    fill(memory, 8)
+    # 0, 1 and 2 are overwritten and the ring starts at 3
+    assert (len(memory), memory.position, memory.oldest()) == (5, 3, 3)
+    assert memory.rewards.tolist() == [5, 6, 7, 3, 4]
+    assert memory.states[:, 0].tolist() == [5, 6, 7, 3, 4]
+    assert memory.legal_masks[memory.oldest()].argmax() == 3
+
+
+def test_sample_offsets_start_at_the_oldest(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    memory: Memory = Memory(5, 3, state_shape=[2], num_actions=4)
+    fill(memory, 8)
+
+    monkeypatch.setattr(random, "sample", lambda population, k: [0, 1, 4])
+    states, actions, rewards, next_states, dones, legal_masks = memory.sample()
+    # offsets 0, 1 and 4 from the oldest transition, which is number 3
+    assert rewards.tolist() == [3, 4, 7]
+    assert states[:, 0].tolist() == [3, 4, 7]
+    assert next_states[:, 0].tolist() == [4, 5, 8]
+    assert actions.tolist() == [3, 0, 3]
+    assert legal_masks.argmax(axis=1).tolist() == [3, 0, 3]
+
+
+def test_sample_skips_overwritten_transitions() -> None:
+    memory: Memory = Memory(5, 5, state_shape=[2], num_actions=4)
+    fill(memory, 8)
+    for _ in range(20):
+        assert sorted(memory.sample()[2].tolist()) == [3, 4, 5, 6, 7]
+
+
+@pytest.mark.parametrize("count", [3, 4])
+def test_load_legacy_list_checkpoint(count: int) -> None:
+    # before the ring buffer, checkpoints held the transitions as a list,
+    # oldest first and at most memory_size of them
+    transitions: List[Transition] = [
+        Transition(
+            np.full(2, i, dtype=np.float32),
+            i % 4,
+            float(i),
+            np.full(2, i + 1, dtype=np.float32),
+            i == count - 1,
+            [i % 4, 3],
+        )
+        for i in range(count)
+    ]
+    checkpoint: dict = {
+        "memory_size": 4,
+        "batch_size": 2,
+        "memory": transitions,
+    }
+    memory: Memory = Memory.from_checkpoint(checkpoint, num_actions=4)
+
+    assert (len(memory), memory.oldest()) == (count, 0)
+    assert memory.position == count % 4
+    assert memory.states[:count, 0].tolist() == list(range(count))
+    assert memory.next_states[:count, 0].tolist() == list(range(1, count + 1))
+    assert memory.rewards[:count].tolist() == list(range(count))
+    assert memory.dones[:count].tolist() == [False] * (count - 1) + [True]
+    assert memory.legal_masks[:count].tolist() == [
+        [j == i % 4 or j == 3 for j in range(4)] for i in range(count)
+    ]
+
+    # the next transition overwrites the oldest once the memory is full
+    fill(memory, 1)
+    assert len(memory) == min(count + 1, 4)
+    assert memory.rewards[memory.oldest()] == (1 if count == 4 else 0)
+
+
+def test_prioritized_sampling_follows_priorities() -> None:
+    np.random.seed(0)
+    memory: PrioritizedMemory = PrioritizedMemory(
+        8, 8, state_shape=[2], num_actions=4, alpha=0.6
+    )
+    fill(memory, 8)
+    td_errors: np.ndarray = np.arange(1.0, 9.0)
+    memory.update_priorities(np.arange(8), td_errors)
+
+    counts: np.ndarray = np.zeros(8)
+    for _ in range(20000):
+        indices = memory.sample()[6]
+        np.add.at(counts, indices, 1)
+    expected: np.ndarray = (td_errors + memory.epsilon) ** 0.6
+    expected /= expected.sum()
+    assert np.abs(counts / counts.sum() - expected).max() < 0.005
+
+
+def test_batched_priority_updates_keep_sums() -> None:
+    rng: np.random.Generator = np.random.default_rng(3)
+    # a capacity short of a power of two leaves empty leaves at the end
+    tree: SumTree = SumTree(13)
+    priorities: np.ndarray = np.zeros(13)
+    for _ in range(200):
+        indices: np.ndarray = rng.integers(13, size=rng.integers(1, 20))
+        # some priorities drop back to 0, which the minimum skips
+        values: np.ndarray = rng.random(len(indices)) * (
+            rng.random(len(indices)) < 0.8
+        )
+        tree.update(indices, values)
+        # with repeated indices the last value is the one kept
+        for index, value in zip(indices, values):
+            priorities[index] = value
+
+        assert np.array_equal(tree.leaves, priorities)
+        assert tree.total == pytest.approx(priorities.sum())
+        positive: np.ndarray = priorities[priorities > 0]
+        assert tree.min == (positive.min() if len(positive) else np.inf)
+        inner: np.ndarray = np.arange(1, tree.leaf_start)
+        assert np.allclose(
+            tree.nodes[inner],
+            tree.nodes[2 * inner] + tree.nodes[2 * inner + 1],
+        )
+
+
+def test_prioritized_checkpoint_round_trip() -> None:
+    memory: PrioritizedMemory = PrioritizedMemory(
+        6, 4, state_shape=[2], num_actions=4, alpha=0.7, epsilon=0.01
+    )
+    fill(memory, 9)
+    memory.update_priorities(np.array([0, 2, 5]), np.array([3.0, -0.5, 9.0]))
+
+    checkpoint: dict = pickle.loads(
+        pickle.dumps(memory.checkpoint_attributes())
+    )
+    restored: PrioritizedMemory = PrioritizedMemory.from_checkpoint(
+        checkpoint, num_actions=4
+    )
+    assert (restored.alpha, restored.epsilon) == (0.7, 0.01)
+    assert restored.max_priority == memory.max_priority
+    assert (len(restored), restored.position) == (6, 3)
+    assert np.array_equal(restored.tree.nodes, memory.tree.nodes)
+    assert np.array_equal(restored.tree.mins, memory.tree.mins)
+
+    # the same draws pick the same transitions with the same weights
+    np.random.seed(1)
+    expected = memory.sample(beta=0.5)
+    np.random.seed(1)
+    for column, batch in zip(expected, restored.sample(beta=0.5)):
+        assert np.array_equal(column, batch)
+
+
+def mapped(directory: str, flush_every: int = 1000) -> MappedMemory:
+    return MappedMemory(
+        5,
+        4,
+        state_shape=[2],
+        num_actions=4,
+        directory=directory,
+        flush_every=flush_every,
+    )
+
+
+def test_mapped_memory_reopens_after_flush(tmp_path) -> None:
+    memory: MappedMemory = mapped(str(tmp_path), flush_every=3)
+    fill(memory, 4)
+    # the fourth save is not flushed, but it was saved completely
+    reopened: MappedMemory = mapped(str(tmp_path))
+    assert (len(reopened), reopened.position, reopened.count) == (4, 4, 4)
+    assert reopened.rewards[:4].tolist() == [0, 1, 2, 3]
+    assert reopened.legal_masks[3].argmax() == 3
+
+    fill(reopened, 3, start=4)
+    reopened.flush()
+    again: MappedMemory = mapped(str(tmp_path))
+    assert (len(again), again.oldest()) == (5, 2)
+    assert again.rewards.tolist() == [5, 6, 2, 3, 4]
+
+
+def test_mapped_memory_rolls_forward_over_unflushed_rows(tmp_path) -> None:
+    memory: MappedMemory = mapped(str(tmp_path))
+    fill(memory, 6)
+    memory.flush()
+    # saved after the flush, over the oldest rows the flush recorded
+    fill(memory, 2, start=6)
+
+    reopened: MappedMemory = mapped(str(tmp_path))
+    assert (len(reopened), reopened.position, reopened.count) == (5, 3, 8)
+    assert reopened.oldest() == 3
+    assert reopened.rewards.tolist() == [5, 6, 7, 3, 4]
+
+
+def test_mapped_memory_drops_a_half_written_row(tmp_path) -> None:
+    memory: MappedMemory = mapped(str(tmp_path))
+    fill(memory, 6)
+    memory.flush()
+    fill(memory, 1, start=6)
+    # a save of transition 7 died after its first column, in the row of
+    # the oldest transition
+    memory.sequences[2] = -1
+    memory.states[2] = 7
+
+    reopened: MappedMemory = mapped(str(tmp_path))
+    assert (len(reopened), reopened.position, reopened.count) == (4, 2, 7)
+    assert reopened.oldest() == 3
+    for _ in range(10):
+        assert sorted(reopened.sample()[2].tolist()) == [3, 4, 5, 6]
+
+    # the next save fills the row again
+    fill(reopened, 1, start=7)
+    assert (len(reopened), reopened.oldest()) == (5, 3)
+
+
+def test_mapped_memory_rejects_rows_it_cannot_explain(tmp_path) -> None:
+    memory: MappedMemory = mapped(str(tmp_path))
+    fill(memory, 4)
+    memory.flush()
+    memory.sequences[1] = 9
+    with pytest.raises(ValueError):
+        mapped(str(tmp_path))
+
+
+def test_mapped_memory_checkpoint_round_trip(tmp_path) -> None:
+    directory: str = str(tmp_path / "replay")
+    agent: DQNAgent = DQNAgent(
+        replay_memory_size=5,
+        batch_size=4,
+        num_actions=4,
+        state_shape=[2],
+        mlp_layers=[8],
+        device="cpu",
+        replay_memory_dir=directory,
+    )
+    fill(agent.memory, 7)
+    checkpoint: dict = pickle.loads(
+        pickle.dumps(agent.checkpoint_attributes())
+    )
+
+    restored: DQNAgent = DQNAgent.from_checkpoint(checkpoint)
+    assert isinstance(restored.memory, MappedMemory)
+    assert (len(restored.memory), restored.memory.oldest()) == (5, 2)
+    assert restored.memory.rewards.tolist() == [5, 6, 2, 3, 4]
+    same: MappedMemory = MappedMemory.from_checkpoint(checkpoint["memory"])
+    assert same.rewards.tolist() == [5, 6, 2, 3, 4]
+
+    # without its files a checkpoint with transitions cannot be restored
+    shutil.rmtree(directory)
+    with pytest.raises(FileNotFoundError):
+        DQNAgent.from_checkpoint(checkpoint)
+    with pytest.raises(FileNotFoundError):
+        MappedMemory.from_checkpoint(checkpoint["memory"])
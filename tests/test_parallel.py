@@ -0,0 +1,52 @@
+from typing import List
+
+import numpy as np
+
+from holdem.environment import Episode, ParallelEnvRunner
+from holdem.models import RandomAgent
+
+
+def play(num_workers: int, seed: int) -> List[Episode]:
+    runner: ParallelEnvRunner = ParallelEnvRunner(
+        [RandomAgent(4), RandomAgent(4)],
+        num_workers=num_workers,
+        seed=seed,
+        deterministic=True,
+    )
+    try:
+        return list(runner.run(40))
+    finally:
+        runner.close()
+
+
+def episode_view(episode: Episode) -> tuple:
+    return (
+        episode.index,
+        episode.starter,
+        episode.players.tolist(),
+        episode.actions.tolist(),
+        episode.legal_masks.tolist(),
+        episode.obs.tolist(),
+        episode.final_obs.tolist(),
+        episode.payoffs,
+    )
+
+
+def test_same_seed_plays_the_same_episodes() -> None:
+    first: List[Episode] = play(2, seed=5)
+    assert [episode.index for episode in first] == list(range(40))
+    # an episode only depends on the seed and its index, whichever worker
+    # plays it
+    for episodes in (play(2, seed=5), play(1, seed=5)):
+        assert [episode_view(e) for e in episodes] == [
+            episode_view(e) for e in first
+        ]
+    assert [episode_view(e) for e in play(2, seed=6)] != [
+        episode_view(e) for e in first
+    ]
+
+
+def test_trajectories_hold_float32_observations() -> None:
+    for trajectory in play(1, seed=5)[0].trajectories():
+        for state in trajectory[::2]:
+            assert state["obs"].dtype == np.float32
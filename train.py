@@ -1,4 +1,5 @@
 import os
+import math
 import argparse
 from typing import Any, Dict, List
 import torch
@@ -23,12 +24,19 @@ def train(args):
         )
     else:
         agent = DQNAgent(
+            replay_memory_size=args.replay_memory_size,
             num_actions=num_actions,
             state_shape=state_shape(__env_config["num_players"])[0],
             mlp_layers=[64, 64],
             device=device,
             save_path=args.log_dir,
             save_every=args.save_every,
+            prioritized_replay=args.prioritized_replay,
+            replay_memory_dir=(
+                os.path.join(args.log_dir, "replay")
+                if args.disk_replay
+                else None
+            ),
         )
     # if args.load_checkpoint_path != "":
     #     agent = QLearningAgent(
@@ -46,25 +54,39 @@ def train(args):
 
     env = Env(**__env_config, agents=agents)
 
-    with Logger(args.log_dir) as logger:
-        for episode in range(args.num_episodes):
-            _, trajectories, payoffs = env.run(is_training=True)
-
-            trajectories = holdem_env.transform_trajectory(
-                trajectories, payoffs
-            )
+    def feed(state, action, reward, next_state, legal_mask, done):
+        agent.feed_transition(
+            state,
+            action,
+            reward,
+            next_state,
+            list(holdem_env.legal_id_lookup[legal_mask]),
+            done,
+        )
 
-            for ts in trajectories[0]:
-                agent.feed(ts)
+    # one pool for the whole run, handed the current agents every time
+    num_eval_workers = min(
+        args.num_eval_workers or os.cpu_count() or 1,
+        math.ceil(args.num_eval_games / 100),
+    )
+    eval_pool = holdem_env.ShardPool(
+        agents, __env_config["num_players"], num_eval_workers
+    )
+    with eval_pool, Logger(args.log_dir) as logger:
+        for episode in range(args.num_episodes):
+            env.stream(feed, players=[0], is_training=True)
 
             if episode % args.evaluate_every == 0:
-                logger.log_perf(
-                    episode,
-                    holdem_env.evaluate_perf(
-                        env,
-                        args.num_eval_games,
-                    )[0],
+                # Every evaluation plays the same deals from the fixed seed:
+                # common random numbers, so the points of the curve differ
+                # by the agent and not by the cards.
+                stats = holdem_env.evaluate_parallel(
+                    agents,
+                    args.num_eval_games,
+                    **__env_config,
+                    pool=eval_pool,
                 )
+                logger.log_perf(episode, stats.mean[0], stats.stderr[0])
 
         csv_path, fig_path = logger.csv_path, logger.fig_path
 
@@ -92,6 +114,11 @@ if __name__ == "__main__":
         type=int,
         default=2000,
     )
+    parser.add_argument(
+        "--num-eval-workers",
+        type=int,
+        default=None,
+    )
     parser.add_argument(
         "--evaluate-every",
         type=int,
@@ -110,6 +137,9 @@ if __name__ == "__main__":
     )
 
     parser.add_argument("--save-every", type=int, default=-1)
+    parser.add_argument("--prioritized-replay", action="store_true")
+    parser.add_argument("--replay-memory-size", type=int, default=20000)
+    parser.add_argument("--disk-replay", action="store_true")
 
     args = parser.parse_args()
 